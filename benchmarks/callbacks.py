@@ -0,0 +1,246 @@
+"""
+Offline benchmark of the spider callbacks. Saved pages from
+benchmarks/fixtures/ are fed straight into parse_movie_list,
+parse_movie_detail, parse_screenshots, parse_cast_and_crew,
+parse_camelcamelcamel and parse_epid_results. There is no engine and no
+network; the spider writes to a throwaway catalog. Reports pages/sec,
+p50/p99 latency and the peak memory allocated per call (tracemalloc, in
+a separate pass so tracing doesn't skew the timings).
+
+With --results, the run is appended to that JSON lines file with the git
+revision, host and Python version, and compared with the last run in it
+from the same host and Python: a callback whose p50 is more than
+--tolerance slower fails the run. Timings from other machines are never
+compared.
+
+    python benchmarks/callbacks.py
+    python benchmarks/callbacks.py --runs 500 --only parse_movie_detail,parse_screenshots
+    python benchmarks/callbacks.py --results benchmarks/results.jsonl
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+from blu_ray_scraper.enrichment import MovieJoin
+from blu_ray_scraper.spiders.bluray_catalog import BluRayCatalogSpider
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+LISTING = ('4k', 'us')
+
+
+def join_meta(branch, **meta):
+    # A fresh join per call: the callback completes (and so uses up) it
+    join = MovieJoin({'title': 'Heat', 'blu_ray_url': 'https://www.blu-ray.com/movies/Heat-4K-Blu-ray/329123/'}, [branch])
+    return {'join': join, 'join_branch': branch, **meta}
+
+
+def epid_meta(spider, name):
+    # The page's UPC has one movie waiting on it
+    meta = join_meta('price', price_details={})
+    spider.ebay_lookups.join(name, (meta['join'], meta['price_details']))
+    return {'upc': name, 'max_results': 4}
+
+
+# callback -> (fixture glob, page URL, meta(spider, page name) for one call)
+CALLBACKS = {
+    'parse_movie_list': (
+        'listing/*.html',
+        lambda name: 'https://www.blu-ray.com/movies/search.php?releaseyear=2019&ultrahd=1&submit=Search&action=search&page=0',
+        lambda spider, name: {'page': 0, 'year': 2019, 'listing': LISTING},
+    ),
+    'parse_movie_detail': (
+        '*.html',
+        lambda name: f'https://www.blu-ray.com/movies/{name}/329123/',
+        lambda spider, name: {'year': 2019, 'listings': [LISTING], 'key': 'movies/329123'},
+    ),
+    'parse_screenshots': (
+        'screenshots/*.html',
+        lambda name: 'https://www.blu-ray.com/movies/Heat-4K-Blu-ray/329123/#Screenshots',
+        lambda spider, name: join_meta('screenshots', screenshot_page=True),
+    ),
+    'parse_cast_and_crew': (
+        'cast/*.html',
+        lambda name: 'https://www.blu-ray.com/movies/movies.php?id=329123&action=showcastandcrew&page=',
+        lambda spider, name: join_meta('cast'),
+    ),
+    'parse_camelcamelcamel': (
+        'camelcamelcamel/*.html',
+        lambda name: f'https://camelcamelcamel.com/product/{name}',
+        lambda spider, name: join_meta('price', price_details={}),
+    ),
+    'parse_epid_results': (
+        'ebay/*.html',
+        lambda name: f'https://www.ebay.com/sch/i.html?_nkw={name}',
+        epid_meta,
+    ),
+}
+
+
+def make_spider(directory):
+    crawler = get_crawler(BluRayCatalogSpider, {
+        'CATALOG_PATH': str(Path(directory) / 'catalog.sqlite'),
+        'CHECKPOINT_DIR': str(Path(directory) / 'checkpoints'),
+        'CHECKPOINT_INTERVAL': 10 ** 9,
+        'PARSE_POOL_WORKERS': 0,
+    })
+    return BluRayCatalogSpider.from_crawler(crawler, countries=LISTING[1], formats=LISTING[0], years='2019')
+
+
+def drain(results):
+    """Everything a callback yields. Async callbacks are stepped by hand:
+    with the parse pool off nothing they await ever suspends."""
+    if not hasattr(results, '__anext__'):
+        return list(results or ())
+    out = []
+    while True:
+        try:
+            results.__anext__().send(None)
+        except StopIteration as e:
+            out.append(e.value)
+        except StopAsyncIteration:
+            return out
+
+
+def load_pages(pattern):
+    return [(path.stem, path.read_bytes()) for path in sorted(FIXTURES.glob(pattern))]
+
+
+def bench(name, runs):
+    pattern, url, meta = CALLBACKS[name]
+    pages = load_pages(pattern)
+    if not pages:
+        return None
+
+    def response(page_name, body):
+        # response.meta is the request's
+        request = Request(url(page_name), meta=meta(spider, page_name))
+        return HtmlResponse(url=request.url, body=body, encoding='utf-8', request=request)
+
+    with tempfile.TemporaryDirectory() as directory:
+        spider = make_spider(directory)
+        callback = getattr(spider, name)
+
+        latencies = []
+        total = 0.0
+        for _ in range(runs):
+            for page_name, body in pages:
+                # A fresh response each time: Scrapy caches the parsed selector on it
+                r = response(page_name, body)
+                started = time.perf_counter()
+                drain(callback(r))
+                elapsed = time.perf_counter() - started
+                latencies.append(elapsed)
+                total += elapsed
+
+        allocations = []
+        tracemalloc.start()
+        for page_name, body in pages * min(runs, 10):
+            r = response(page_name, body)
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            drain(callback(r))
+            allocations.append(tracemalloc.get_traced_memory()[1] - before)
+        tracemalloc.stop()
+        spider.closed('finished')
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        'pages': len(pages),
+        'pages_per_sec': round(len(latencies) / total, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p99_ms': round(quantiles[98] * 1000, 3),
+        'alloc_kib': round(statistics.median(allocations) / 1024, 1),
+    }
+
+
+def git_revision():
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return rev + ('-dirty' if dirty else '')
+
+
+def previous_run(path, host, python):
+    """Last run in `path` made on `host` with the same Python version, or None."""
+    if path is None or not path.exists():
+        return None
+    for line in reversed(path.read_text(encoding='utf-8').splitlines()):
+        run = json.loads(line)
+        if run.get('host') == host and run.get('python') == python:
+            return run
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=100)
+    parser.add_argument('--only', help='comma separated callbacks')
+    parser.add_argument('--results', help='JSON lines file to append this run to and compare it with')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p50 slowdown against the previous run')
+    args = parser.parse_args()
+
+    # The spiders log every page at INFO; only the numbers matter here
+    logging.disable(logging.WARNING)
+
+    names = args.only.split(',') if args.only else list(CALLBACKS)
+    unknown = [name for name in names if name not in CALLBACKS]
+    if unknown:
+        sys.exit(f'Unknown callbacks {unknown}, expected some of {list(CALLBACKS)}')
+
+    host = platform.node()
+    python = sys.version.split()[0]
+    results_path = Path(args.results) if args.results else None
+    previous = previous_run(results_path, host, python)
+    baseline = (previous or {}).get('callbacks', {})
+
+    run = {
+        'at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'rev': git_revision(),
+        'runs': args.runs,
+        'host': host,
+        'python': python,
+        'callbacks': {},
+    }
+    regressions = []
+    print(f'{"callback":<24}{"pages/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"alloc KiB":>11}  vs {(previous or {}).get("rev") or "-"}')
+    for name in names:
+        stats = bench(name, args.runs)
+        if stats is None:
+            print(f'{name:<24}  no fixtures for {CALLBACKS[name][0]}')
+            continue
+        run['callbacks'][name] = stats
+        change = ''
+        old = baseline.get(name)
+        if old:
+            ratio = stats['p50_ms'] / old['p50_ms'] - 1
+            change = f'{ratio:+.0%}'
+            if ratio > args.tolerance:
+                change += '  REGRESSION'
+                regressions.append(name)
+        print(f'{name:<24}{stats["pages_per_sec"]:>10}{stats["p50_ms"]:>10}{stats["p99_ms"]:>10}{stats["alloc_kib"]:>11}  {change}')
+
+    if results_path is not None:
+        with open(results_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(run) + '\n')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
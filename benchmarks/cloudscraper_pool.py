@@ -0,0 +1,76 @@
+"""
+Pages/sec through ThreadedCloudScraperMiddleware for a range of pool sizes,
+against a local server that answers every request after a fixed delay.
+
+    python benchmarks/cloudscraper_pool.py --pages 200 --latency 0.1 --sizes 1,2,4,8,16
+"""
+import argparse
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import scrapy
+from twisted.internet import defer, task
+
+from blu_ray_scraper.cloudscraper_middleware import ThreadedCloudScraperMiddleware
+
+PAGE = b'<html><body><a href="https://www.blu-ray.com/">Blu-ray.com</a></body></html>'
+
+
+def start_server(latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@defer.inlineCallbacks
+def run_pool(spider, base_url, pool_size, pages):
+    mw = ThreadedCloudScraperMiddleware(pool_size=pool_size, per_host=pool_size, timeout=30)
+    mw.spider_opened(spider)
+    started = time.perf_counter()
+    try:
+        yield defer.gatherResults([
+            mw.process_request(scrapy.Request(f"{base_url}/movies/{i}/"), spider)
+            for i in range(pages)
+        ], consumeErrors=True)
+    finally:
+        mw.spider_closed(spider)
+    return pages / (time.perf_counter() - started)
+
+
+@defer.inlineCallbacks
+def main(reactor, args):
+    server = start_server(args.latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    spider = scrapy.Spider(name="benchmark")
+
+    print(f"{'pool':>6} {'pages/sec':>10}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        rate = yield run_pool(spider, base_url, size, args.pages)
+        print(f"{size:>6} {rate:>10.1f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.1, help="server delay per page, seconds")
+    parser.add_argument("--sizes", default="1,2,4,8,16")
+    task.react(main, [parser.parse_args()])
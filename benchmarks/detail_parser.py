@@ -0,0 +1,242 @@
+"""
+Parse time per detail page: parse_detail_page (one lxml pass) against the
+selector-per-field extraction parse_movie_detail used before, on the saved
+pages in benchmarks/fixtures/ (or any directory of detail pages). Also
+checks that both produce the same fields.
+
+    python benchmarks/detail_parser.py --runs 200
+    python benchmarks/detail_parser.py --fixtures path/to/saved/pages
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import scrapy
+from scrapy.http import HtmlResponse
+
+from blu_ray_scraper.detail_parser import parse_detail_page
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+
+
+def get_text_between(selector, start_text, end_text=None):
+    text = selector.xpath("string()").get()
+    if not text:
+        return ""
+    start_idx = text.find(start_text)
+    if start_idx == -1:
+        return ""
+    end_idx = text.find(end_text, start_idx + len(start_text)) if end_text else -1
+    return text[start_idx + len(start_text):end_idx].strip() if end_idx != -1 else text[start_idx + len(start_text):].strip()
+
+
+def selector_extract(response):
+    """The extraction parse_movie_detail did before detail_parser, query by query."""
+    movie_details = {}
+
+    core_info = response.css('span.subheading.grey ::text').getall()
+    core_info = ' '.join(t.strip() for t in core_info if t.strip())
+    core_texts = [t.strip() for t in core_info.split('|')] if core_info else []
+
+    movie_details["production"] = ""
+    for text in core_texts:
+        if re.fullmatch(r"\d{4}(-\d{4})?", text):
+            movie_details["production_year"] = text
+        elif 'min' in text:
+            movie_details["runtime"] = text
+        elif 'rated' in text.lower():
+            movie_details["age_rating"] = text
+        elif re.fullmatch(r"[A-Za-z]+ \d{2}, \d{4}", text):
+            movie_details["release_date"] = text
+        elif not movie_details["production"]:
+            movie_details["production"] = text
+
+    # Technical Specs
+    td = response.xpath("//td[@width='228px']").get()
+    if td:
+        specs_html = scrapy.Selector(text=td)
+        # Remove <br> tags from specs HTML
+        specs_html = scrapy.Selector(text=td.replace('<br>', '\n'))
+        headers = specs_html.css(".subheading *::text").getall()
+        n = len(headers)
+        for i in range(n):
+            current = headers[i]
+            next_header = headers[i + 1] if i + 1 < n else None
+            raw_section = get_text_between(specs_html, current, next_header)
+
+            if current in ['Video']:
+                for line in raw_section.split('\n'):
+                    if 'Codec' in line:
+                        movie_details['codec'] = line.split(':', 1)[-1].strip()
+                    elif 'Encoding' in line:
+                        movie_details['encoding'] = line.split(':', 1)[-1].strip()
+                    elif 'Resolution' in line:
+                        movie_details['resolution'] = line.split(':', 1)[-1].strip()
+                    elif 'Aspect ratio' in line:
+                        movie_details['aspect_ratio'] = line.split(':', 1)[-1].strip()
+                    elif 'Original aspect ratio' in line:
+                        movie_details['original_aspect_ratio'] = line.split(':', 1)[-1].strip()
+            elif current in ['Discs', 'Disc']:
+                movie_details['discs'] = raw_section.split('\n')
+            elif current == 'Playback':
+                movie_details['playback'] = raw_section.split('\n')
+            elif current == 'Packaging':
+                movie_details['packaging'] = raw_section.split('\n')
+
+    # Audio
+    audio_lines = response.css('div#longaudio::text').getall()
+    audio_text = ", ".join([line.strip() for line in audio_lines if line.strip()])
+    movie_details['audio'] = audio_text.replace(', (, )', '').replace('("less")', '').replace('(, )', '')
+
+    # Subtitles
+    subs = response.css('div#longsubs::text').getall()
+    subs_text = ", ".join([s.strip() for s in subs if s.strip()])
+    movie_details['subtitles'] = subs_text.replace(', (, )', '').replace('("less")', '').replace('(, )', '')
+
+    # Pricing
+    pricing_td_html = response.xpath("//td[@width='266px']").get()
+    if pricing_td_html:
+        pricing_selector = scrapy.Selector(text=pricing_td_html)
+        pricing_text = get_text_between(pricing_selector, "Price", "Price")
+        for line in pricing_text.split('\n'):
+            if 'Used' in line:
+                movie_details['used_price'] = line.split("$")[-1].strip().split()[0]
+            elif 'New' in line:
+                movie_details['new_price'] = line.split("$")[-1].strip().split()[0]
+
+    # Titles, Description, Cast
+    movie_details['title'] = response.css("#movie_info h3::text").get(default="").strip()
+    movie_details['subheading_title'] = response.css('.subheadingtitle::text').get(default="").strip()
+
+    info_html = response.xpath("//div[@id='movie_info']").get()
+    # info_element = scrapy.Selector(text=info_html.replace('<br>', '\n') )
+    info_text = response.css("#movie_info *::text").getall()
+    # info_text = 
+    info_text = [line.strip() for line in info_text if line.strip() and "Screenshots" not in line]
+
+    description_lines = []
+    for line in info_text[1:]:
+        if any(x in line for x in ["Directors:", "Producers:", "Starring:", "Writers:", "Narrator:", "Director:", "Producer:"]):
+            break
+        description_lines.append(line)
+    movie_details["description"] = "\n".join(description_lines)
+
+    # cast and crew
+    cast_crew_page_url = response.xpath("//a[contains(@href, '#Castandcrew')]/@href").get()
+    if cast_crew_page_url:
+        pass
+    else:
+        movie_details['cast_and_crew2'] = {}
+        key = None
+        for line in info_text:
+            changed_now = False
+            if "Director:" in line or "Directors:" in line:
+                key = "Director"
+                changed_now = True
+            elif "Starring:" in line:
+                key = "Cast"
+                changed_now = True
+            elif "Writers:" in line or "Writer:" in line:
+                key = "Writer"
+                changed_now = True
+            elif "Producers:" in line or "Producer:" in line:
+                key = "Producer"
+                changed_now = True
+            elif "Narrator:" in line or "Narrators:" in line:
+                key = "Narrator"
+                changed_now = True
+            elif "Composer:" in line or "Composers:" in line:
+                key = "Composer"
+                changed_now = True
+            if key:
+                if changed_now: continue
+                if '»' in line: continue
+                if 'cast & crew' in line: continue
+                if ',' in line: continue
+                if ':' in line: continue
+                if key in movie_details['cast_and_crew2']:
+                    movie_details['cast_and_crew2'][key].append({line.split(":", 1)[-1].strip()})
+                else:
+                    movie_details['cast_and_crew2'][key] = [line.split(":", 1)[-1].strip()]
+
+    # Genres
+    genres = response.css('.genreappeal *::text').getall()[:3]
+    genres = [g.strip() for g in genres if g.strip()]
+    movie_details['genres'] = genres
+
+    # Amazon ID
+    amzn_link = response.css("#movie_buylink::attr(href)").get()
+    ebay_link = response.css("a[href*='/sch/i.html?_nkw=']::attr(href)").get()
+    if ebay_link:
+        upc = movie_details.get('upc') or parse_qs(urlparse(ebay_link).query).get('_nkw', [''])[0]
+        movie_details['upc'] = upc
+
+    links = {
+        'home': bool(response.xpath('//a[@href="https://www.blu-ray.com/"]')),
+        'cast_crew': cast_crew_page_url,
+        'screenshots': response.xpath('//a[contains(@href, "#Screenshots")]/@href').get(),
+        'amazon': amzn_link,
+        'ebay': ebay_link,
+        'scripts': "\n".join(response.xpath('//script/text()').getall()),
+    }
+    return movie_details, links
+
+
+def lxml_extract(response):
+    return parse_detail_page(response.text)
+
+
+def load_pages(directory):
+    pages = []
+    for path in sorted(Path(directory).glob('*.html')):
+        pages.append((path.name, path.read_bytes()))
+    return pages
+
+
+def time_per_page(extract, pages, runs):
+    started = time.perf_counter()
+    for _ in range(runs):
+        for name, body in pages:
+            # A fresh response each time: Scrapy caches the parsed selector on it
+            extract(HtmlResponse(url=f'https://www.blu-ray.com/movies/{name}/', body=body, encoding='utf-8'))
+    return (time.perf_counter() - started) / (runs * len(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fixtures', default=str(FIXTURES))
+    parser.add_argument('--runs', type=int, default=100)
+    args = parser.parse_args()
+
+    pages = load_pages(args.fixtures)
+    if not pages:
+        sys.exit(f'No .html pages in {args.fixtures}')
+
+    mismatches = 0
+    for name, body in pages:
+        response = HtmlResponse(url=f'https://www.blu-ray.com/movies/{name}/', body=body, encoding='utf-8')
+        expected, new = selector_extract(response), lxml_extract(response)
+        if expected != new:
+            mismatches += 1
+            print(f'{name}: outputs differ')
+            for part, old_part, new_part in zip(('details', 'links'), expected, new):
+                for key in sorted(set(old_part) | set(new_part)):
+                    if old_part.get(key) != new_part.get(key):
+                        print(f'  {part}[{key!r}]: {old_part.get(key)!r} != {new_part.get(key)!r}')
+
+    old = time_per_page(selector_extract, pages, args.runs)
+    new = time_per_page(lxml_extract, pages, args.runs)
+    print(f'{len(pages)} pages x {args.runs} runs')
+    print(f'selectors:         {old * 1000:7.3f} ms/page')
+    print(f'parse_detail_page: {new * 1000:7.3f} ms/page  ({old / new:.1f}x)')
+    print(f'outputs identical on {len(pages) - mismatches}/{len(pages)} pages')
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
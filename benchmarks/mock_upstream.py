@@ -0,0 +1,261 @@
+"""
+Local stand-in for blu-ray.com, its image CDN, camelcamelcamel and eBay,
+so full-crawl throughput can be measured without going near (and getting
+banned by) the real sites.
+
+Listings are generated: every year has --titles movies in the Blu-ray
+search, a third of them also in the 4K search and a tenth in the 3D one,
+like the real overlap. Detail, cast, camelcamelcamel and eBay pages are
+the fixtures in benchmarks/fixtures/, with their links rewritten to this
+server and the ID, buy link and UPC of the title being asked for. Every
+.jpg is benchmarks/fixtures/image.jpg. The Amazon buy link redirects to
+an amazon.com /dp/ URL, which the spider never downloads.
+
+Every request waits --latency (+ up to --jitter) seconds, and fails with
+a 403, 429 or 503 at the given rates.
+
+    python benchmarks/mock_upstream.py --port 8765 --latency 0.05 --forbidden-rate 0.001 --error-rate 0.01
+
+prints the `scrapy crawl` flags that point the spiders at it, and the
+requests served per route when stopped with Ctrl-C.
+"""
+import argparse
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+LISTING_PAGE_SIZE = 20
+UPSTREAMS = {
+    'https://www.blu-ray.com': 'BLURAY_BASE_URL',
+    'https://images.static-bluray.com': 'BLURAY_IMAGES_BASE_URL',
+    'https://camelcamelcamel.com': 'CAMELCAMELCAMEL_BASE_URL',
+    'https://www.ebay.com': 'EBAY_BASE_URL',
+}
+
+DETAIL_PATH_RE = re.compile(r'^/(movies|dvd)/[^/]+/(\d+)/$')
+OWN_PATH_RE = re.compile(r'(/(?:movies|dvd)/[^"/]+/\d+/)#(?:Castandcrew|Screenshots)')
+BUY_LINK_RE = re.compile(r'(click\.php\?retailerid=1&(?:amp;)?url=)\d+')
+UPC_RE = re.compile(r'(_nkw=)\d+')
+
+
+def asin(key):
+    return f'B{key:09d}'
+
+
+def upc(key):
+    return f'{key:012d}'
+
+
+class Fixtures:
+
+    def __init__(self, directory, base_url):
+        self.base_url = base_url
+        self.details = [self.load(path) for path in sorted(Path(directory).glob('*.html'))]
+        self.cast = [self.load(path) for path in sorted(Path(directory).glob('cast/*.html'))]
+        self.camelcamelcamel = [self.load(path) for path in sorted(Path(directory).glob('camelcamelcamel/*.html'))]
+        self.ebay = [self.load(path) for path in sorted(Path(directory).glob('ebay/*.html'))]
+        self.image = (Path(directory) / 'image.jpg').read_bytes()
+        if not self.details:
+            sys.exit(f'No detail pages in {directory}')
+
+    def load(self, path):
+        text = path.read_text(encoding='utf-8')
+        for upstream in UPSTREAMS:
+            text = text.replace(upstream, self.base_url)
+        return text
+
+    @staticmethod
+    def pick(pages, key):
+        return pages[key % len(pages)] if pages else '<html><body></body></html>'
+
+    def detail(self, path, key):
+        text = self.pick(self.details, key)
+        own_path = OWN_PATH_RE.search(text)
+        if own_path:
+            text = text.replace(own_path.group(1), path)
+        text = BUY_LINK_RE.sub(rf'\g<1>{key}', text)
+        return UPC_RE.sub(rf'\g<1>{upc(key)}', text)
+
+    def product(self, key):
+        text = self.pick(self.camelcamelcamel, key)
+        text = re.sub(r'B0[A-Z0-9]{8}', asin(key), text)
+        return re.sub(r'\b\d{12}\b', upc(key), text)
+
+
+def listing_titles(section, query, year, titles):
+    """
+    IDs of one year's search results; 4K and 3D are a prefix of the Blu-ray
+    ones. DVDs are numbered on their own, so their IDs overlap the Blu-ray
+    ones like on the real site.
+    """
+    if 'ultrahd' in query:
+        count = titles // 3
+    elif 'other_bluray3d' in query:
+        count = titles // 10
+    else:
+        count = titles
+    return [year * 1000 + i for i in range(count)]
+
+
+def listing_page(base_url, section, keys, page):
+    rows = ''.join(
+        f'<tr><td><a href="{base_url}/{section}/Mock-Title-{key}/{key}/">Mock Title {key}</a>'
+        f'<br><span class="grey">Studio</span></td></tr>\n'
+        for key in keys[page * LISTING_PAGE_SIZE:(page + 1) * LISTING_PAGE_SIZE]
+    )
+    return (
+        f'<html><body><a href="{base_url}/">Blu-ray.com</a>\n'
+        f'<h1 class="oswaldcollection">{len(keys)} results</h1>\n'
+        f'<table class="bevel" width="100%">\n{rows}</table></body></html>'
+    )
+
+
+def make_handler(args, fixtures, served):
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *log_args):
+            pass
+
+        def send(self, status, body=b'', content_type='text/html; charset=utf-8', route='', headers=None):
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+            with lock:
+                served[(route, status)] += 1
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            route = self.route(url.path)
+
+            time.sleep(args.latency + random.uniform(0, args.jitter))
+            roll = random.random()
+            if roll < args.forbidden_rate:
+                return self.send(403, 'Forbidden', route=route)
+            roll -= args.forbidden_rate
+            if roll < args.rate_limit_rate:
+                return self.send(429, 'Too Many Requests', route=route, headers={'Retry-After': '1'})
+            roll -= args.rate_limit_rate
+            if roll < args.error_rate:
+                return self.send(503, 'Service Unavailable', route=route)
+
+            if route == 'image':
+                return self.send(200, fixtures.image, 'image/jpeg', route)
+            if route == 'listing':
+                section = url.path.split('/')[1]
+                year = int(query.get('releaseyear', ['2000'])[0])
+                page = int(query.get('page', ['0'])[0])
+                keys = listing_titles(section, url.query, year, args.titles)
+                return self.send(200, listing_page(fixtures.base_url, section, keys, page), route=route)
+            if route == 'detail':
+                key = int(DETAIL_PATH_RE.match(url.path).group(2))
+                return self.send(200, fixtures.detail(url.path, key), route=route)
+            if route == 'cast':
+                key = int(query.get('id', ['0'])[0])
+                return self.send(200, fixtures.pick(fixtures.cast, key), route=route)
+            if route == 'buy':
+                key = int(query.get('url', ['0'])[0])
+                return self.send(302, route=route, headers={'Location': f'https://www.amazon.com/dp/{asin(key)}'})
+            if route == 'camelcamelcamel':
+                key = int(re.sub(r'\D', '', url.path.rsplit('/', 1)[-1]) or 0)
+                return self.send(200, fixtures.product(key), route=route)
+            if route == 'ebay':
+                key = int(query.get('_nkw', ['0'])[0] or 0)
+                return self.send(200, fixtures.pick(fixtures.ebay, key), route=route)
+            if route == 'home':
+                return self.send(200, f'<html><body><a href="{fixtures.base_url}/">Blu-ray.com</a></body></html>', route=route)
+            return self.send(404, 'Not Found', route=route)
+
+        @staticmethod
+        def route(path):
+            if path.endswith('.jpg'):
+                return 'image'
+            if path.endswith('/search.php'):
+                return 'listing'
+            if DETAIL_PATH_RE.match(path):
+                return 'detail'
+            if path in ('/movies/movies.php', '/dvd/movies.php'):
+                return 'cast'
+            if path == '/link/click.php':
+                return 'buy'
+            if path.startswith('/product/'):
+                return 'camelcamelcamel'
+            if path == '/sch/i.html':
+                return 'ebay'
+            if path == '/':
+                return 'home'
+            return 'other'
+
+    return Handler
+
+
+def crawl_flags(base_url):
+    flags = [f'-s {setting}={base_url}' for setting in UPSTREAMS.values()]
+    host = urlparse(base_url).hostname
+    flags += [
+        '-s PRICE_PROXY=',
+        '-s CATALOG_PATH=data/mock/catalog.sqlite',
+        '-s CHECKPOINT_DIR=data/mock/checkpoints',
+        '-s IMAGES_STORE=data/mock/images',
+        f'-s HOSTHEALTH_CRITICAL_HOSTS={host}',
+        f"-s 'ADAPTIVE_DOMAINS={{\"{host}\": {{\"concurrency\": 8, \"delay\": 0, \"max_concurrency\": 64}}}}'",
+    ]
+    return ' \\\n    '.join(flags)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures', default=str(FIXTURES))
+    parser.add_argument('--titles', type=int, default=60, help='Blu-ray titles per year')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds before every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many extra seconds')
+    parser.add_argument('--forbidden-rate', type=float, default=0.0, help='share of requests answered with a 403')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='share of requests answered with a 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with a 503')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    base_url = f'http://{args.host}:{args.port}'
+    fixtures = Fixtures(args.fixtures, base_url)
+    served = Counter()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args, fixtures, served))
+    server.daemon_threads = True
+
+    print(f'Mock upstream on {base_url}. Crawl it with:\n')
+    print(f'scrapy crawl bluray_catalog -a country=us -a formats=br,4k,3d -a years=2019-2020 \\\n    {crawl_flags(base_url)}\n')
+    started = time.monotonic()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+    elapsed = time.monotonic() - started
+    total = sum(served.values())
+    print(f'\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f}/s)')
+    for (route, status), count in sorted(served.items()):
+        print(f'  {route:<16}{status:>4}{count:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""
+Country-normalised catalog.
+
+Detail pages don't depend on the country cookie, so the catalog keeps one
+canonical record per title (keyed by section and ID, 'movies/2343' or
+'dvd/2343', see known_titles.title_id) and a separate, compact
+title x country x format membership table. Per-country views (the old
+data/<fmt>-<country>.json files, the Excel exports) are produced by joining
+the two.
+
+    python -m blu_ray_scraper.catalog import data/4k-us.jsonl --format 4k --country us
+    python -m blu_ray_scraper.catalog import-all
+
+The spiders run import-all themselves when they open an empty catalog, so
+the data files of the old per-format spiders are picked up on the first run.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sqlite3
+import time
+
+from blu_ray_scraper.item_store import iter_items, json_default
+from blu_ray_scraper.known_titles import title_id
+
+# Per-listing fields; membership lives in its own table, not in the record
+MEMBERSHIP_FIELDS = ('listings', 'formats', 'countries')
+
+# Written by the camelcamelcamel / eBay hops; refreshed on their own by the price_refresh spider
+PRICE_FIELDS = (
+    'amazon_id', 'upc', 'isbn', 'ean', 'sku', 'manufacturer', 'epid',
+    'amazon_current_price', 'amazon_average_price', 'third_used_current_price', 'third_used_average_price',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS titles (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    record TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS membership (
+    id TEXT NOT NULL,
+    country TEXT NOT NULL,
+    format TEXT NOT NULL,
+    PRIMARY KEY (id, country, format)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS membership_listing ON membership (country, format);
+CREATE TABLE IF NOT EXISTS listing_counts (
+    format TEXT NOT NULL,
+    country TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (format, country, year)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ebay_searches (
+    upc TEXT PRIMARY KEY,
+    results TEXT NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class Catalog:
+
+    def __init__(self, path='data/catalog.sqlite', commit_every=500):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.commit_every = commit_every
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+        self._ids = None
+        self._writes = 0
+
+    def _migrate(self):
+        # Catalogs written before the section was part of the key have bare
+        # numeric IDs; rebuild both tables with 'movies/<id>' / 'dvd/<id>' keys
+        columns = {row[1]: row[2] for row in self.conn.execute('PRAGMA table_info(titles)')}
+        if columns.get('id') != 'INTEGER':
+            return
+        from blu_ray_scraper.spiders.bluray_catalog import FORMATS
+
+        sections = {fmt: config['section'] for fmt, config in FORMATS.items()}
+        self.conn.create_function('title_key', 1, title_id)
+        self.conn.create_function('format_section', 1, lambda fmt: sections.get(fmt, 'movies'))
+        self.conn.execute('BEGIN')
+        self.conn.execute('DROP INDEX IF EXISTS membership_listing')
+        self.conn.execute('ALTER TABLE titles RENAME TO titles_old')
+        self.conn.execute('ALTER TABLE membership RENAME TO membership_old')
+        for statement in SCHEMA.split(';'):
+            if statement.strip():
+                self.conn.execute(statement)
+        self.conn.execute(
+            'INSERT OR REPLACE INTO titles SELECT title_key(url), url, record, updated_at FROM titles_old '
+            'WHERE title_key(url) IS NOT NULL'
+        )
+        self.conn.execute(
+            "INSERT OR IGNORE INTO membership SELECT format_section(format) || '/' || id, country, format FROM membership_old"
+        )
+        self.conn.execute('DROP TABLE titles_old')
+        self.conn.execute('DROP TABLE membership_old')
+        self.conn.commit()
+
+    @property
+    def ids(self):
+        """Keys that already have a record, loaded once on first use."""
+        if self._ids is None:
+            self._ids = {row[0] for row in self.conn.execute('SELECT id FROM titles')}
+        return self._ids
+
+    def __contains__(self, key):
+        # A key or a movie URL
+        key = title_id(key)
+        return key is not None and key in self.ids
+
+    def upsert(self, item):
+        record = {k: v for k, v in dict(item).items() if k not in MEMBERSHIP_FIELDS}
+        key = title_id(record.get('blu_ray_url'))
+        if key is None:
+            return None
+        self.conn.execute(
+            'INSERT OR REPLACE INTO titles (id, url, record, updated_at) VALUES (?, ?, ?, ?)',
+            (key, record['blu_ray_url'], json.dumps(record, ensure_ascii=False, default=json_default), time.time()),
+        )
+        self.ids.add(key)
+        self._written()
+        return key
+
+    def update_fields(self, key, fields):
+        """Merge `fields` into an existing record; False when there is no record for `key`."""
+        record = self.get(key)
+        if record is None:
+            return False
+        record.update(fields)
+        self.conn.execute(
+            'UPDATE titles SET record = ?, updated_at = ? WHERE id = ?',
+            (json.dumps(record, ensure_ascii=False, default=json_default), time.time(), key),
+        )
+        self._written()
+        return True
+
+    def records(self):
+        """
+        (id, record) of every title. Read on a connection of its own, so
+        records can be updated while this is being iterated.
+        """
+        conn = sqlite3.connect(self.path)
+        try:
+            for key, record in conn.execute('SELECT id, record FROM titles ORDER BY id'):
+                yield key, json.loads(record)
+        finally:
+            conn.close()
+
+    def add_memberships(self, rows):
+        """rows: iterable of (key, country, format)."""
+        rows = [row for row in rows if row[0] is not None]
+        if rows:
+            self.conn.executemany('INSERT OR IGNORE INTO membership (id, country, format) VALUES (?, ?, ?)', rows)
+            self._written(len(rows))
+
+    def listing_count(self, fmt, country, year):
+        """Result count last seen on page 0 of a listing, or None."""
+        row = self.conn.execute(
+            'SELECT count FROM listing_counts WHERE format = ? AND country = ? AND year = ?', (fmt, country, year)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_listing_count(self, fmt, country, year, count):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO listing_counts (format, country, year, count, updated_at) VALUES (?, ?, ?, ?, ?)',
+            (fmt, country, year, count, time.time()),
+        )
+        self._written()
+
+    def cached_ebay_results(self, upc, ttl, miss_ttl=None):
+        """
+        (title, epid) listings of an eBay search for a UPC made less than
+        `ttl` seconds ago (an empty list when nothing linked to a product,
+        then within `miss_ttl`), or None when it has to be searched (again).
+        """
+        row = self.conn.execute('SELECT results, updated_at FROM ebay_searches WHERE upc = ?', (upc,)).fetchone()
+        if row is None:
+            return None
+        results, updated_at = json.loads(row[0]), row[1]
+        max_age = ttl if results or miss_ttl is None else miss_ttl
+        return results if time.time() - updated_at < max_age else None
+
+    def set_ebay_results(self, upc, results):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO ebay_searches (upc, results, updated_at) VALUES (?, ?, ?)',
+            (upc, json.dumps(results), time.time()),
+        )
+        self._written()
+
+    def get(self, key):
+        row = self.conn.execute('SELECT record FROM titles WHERE id = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def view(self, country, fmt=None):
+        """Records listed in `country` (and `fmt`), streamed from the join."""
+        query = 'SELECT DISTINCT t.id, t.record FROM titles t JOIN membership m ON m.id = t.id WHERE m.country = ?'
+        params = [country]
+        if fmt:
+            query += ' AND m.format = ?'
+            params.append(fmt)
+        for _, record in self.conn.execute(query + ' ORDER BY t.id', params):
+            yield json.loads(record)
+
+    def views(self, fmt=None):
+        """
+        (record, countries) for every title, in a single pass over the
+        catalog, so all per-country exports can be written together.
+        """
+        query = 'SELECT t.record, group_concat(DISTINCT m.country) FROM titles t JOIN membership m ON m.id = t.id'
+        params = []
+        if fmt:
+            query += ' WHERE m.format = ?'
+            params.append(fmt)
+        for record, countries in self.conn.execute(query + ' GROUP BY t.id ORDER BY t.id', params):
+            yield json.loads(record), countries.split(',')
+
+    def import_items(self, items, country, fmt):
+        count = 0
+        for item in items:
+            key = self.upsert(item)
+            self.add_memberships([(key, country, fmt)])
+            count += 1
+        self.commit()
+        return count
+
+    def _written(self, n=1):
+        self._writes += n
+        if self._writes >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._writes = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+STORE_FILE_RE = re.compile(r'^(?P<store>[A-Za-z0-9]+)-(?P<country>[a-z]{2})\.jsonl?$')
+
+
+def import_all(catalog, data_dir='data', log=print):
+    from blu_ray_scraper.spiders.bluray_catalog import FORMATS
+
+    formats = {config['store'].lower(): fmt for fmt, config in FORMATS.items()}
+    for path in sorted(glob.glob(os.path.join(data_dir, '*.json*'))):
+        match = STORE_FILE_RE.match(os.path.basename(path))
+        if not match or match.group('store').lower() not in formats:
+            continue
+        fmt = formats[match.group('store').lower()]
+        count = catalog.import_items(iter_items(path), match.group('country'), fmt)
+        log(f'{path}: {count} records as {fmt}/{match.group("country")}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--catalog', default='data/catalog.sqlite')
+    commands = parser.add_subparsers(dest='command', required=True)
+    single = commands.add_parser('import', help='import one data file')
+    single.add_argument('path')
+    single.add_argument('--format', required=True)
+    single.add_argument('--country', required=True)
+    every = commands.add_parser('import-all', help='import every data/<fmt>-<country>.json(l) file')
+    every.add_argument('--data-dir', default='data')
+    args = parser.parse_args()
+
+    catalog = Catalog(args.catalog)
+    if args.command == 'import':
+        print(catalog.import_items(iter_items(args.path), args.country, args.format))
+    else:
+        import_all(catalog, args.data_dir)
+    catalog.close()
@@ -1,50 +1,152 @@
-# mobygames_scraper/middlewares/cloudscraper_middleware.py
+import threading
+from urllib.parse import urlparse
 
-import cloudscraper
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
 from scrapy.http import HtmlResponse, Response
+from twisted.internet.defer import DeferredSemaphore
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
+
+IMAGE_EXTENSIONS = (".jpg", ".png", ".jpeg", ".gif", ".bmp", ".webp")
+
+
+def create_scraper():
+    # Optional dependency, only needed with CLOUDSCRAPER_ENABLED
+    import cloudscraper
+
+    return cloudscraper.create_scraper(
+        browser={'browser': 'chrome', 'platform': 'windows'}
+    )
+
+
+def should_bypass(request, spider):
+    # Only intercept HTTP GET requests
+    if request.url.endswith(IMAGE_EXTENSIONS):
+        return True  # Let Scrapy handle these
+
+    if request.meta.get('zyte'):
+        # Skip cloudscraper for Zyte proxy requests
+        spider.logger.debug(f"Skipping Cloudscraper for: {request.url}")
+        return True
+
+    return request.method != "GET"
+
+
+def build_response(request, response):
+    content_type = response.headers.get("Content-Type", "").lower()
+    body = response.content
+    # requests has already decoded the body; keep Location and the like for
+    # Scrapy's redirect handling
+    headers = {
+        name: value for name, value in response.headers.items()
+        if name.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')
+    }
+
+    if "image" in content_type or request.url.endswith(IMAGE_EXTENSIONS):
+        return Response(
+            url=request.url,
+            status=response.status_code,
+            headers=headers,
+            body=body,
+            request=request,
+        )
+    else:
+        return HtmlResponse(
+            url=request.url,
+            status=response.status_code,
+            headers=headers,
+            body=body,
+            encoding='utf-8',
+            request=request,
+        )
 
 
 class CloudScraperMiddleware:
-    
+
     def __init__(self):
-        self.scraper = cloudscraper.create_scraper(
-            browser={'browser': 'chrome', 'platform': 'windows'}
-        )
+        self.scraper = create_scraper()
 
     def process_request(self, request, spider):
-        # Only intercept HTTP GET requests
-        if request.url.endswith((".jpg", ".png", ".jpeg", ".gif", ".bmp", ".webp")):
-            return None  # Let Scrapy handle these
-
-        if request.meta.get('zyte'):
-            # Skip cloudscraper for Zyte proxy requests
-            spider.logger.debug(f"Skipping Cloudscraper for: {request.url}")
+        if should_bypass(request, spider):
             return None
 
-        if request.method != "GET":
+        spider.logger.info(f"Cloudscraper fetching: {request.url}")
+        # response = self.scraper.get(request.url, cookies=self.cookies)
+        response = self.scraper.get(request.url, allow_redirects=False)
+        return build_response(request, response)
+
+
+class ThreadedCloudScraperMiddleware:
+    """
+    Same interception rules as CloudScraperMiddleware, but the blocking
+    cloudscraper call runs on a bounded worker pool and process_request
+    returns a Deferred, so the reactor keeps serving other downloads.
+
+    Settings:
+        CLOUDSCRAPER_ENABLED    - off by default; needs the cloudscraper package
+        CLOUDSCRAPER_POOL_SIZE  - worker threads, each with its own session
+        CLOUDSCRAPER_PER_HOST   - max in-flight cloudscraper fetches per host
+        CLOUDSCRAPER_TIMEOUT    - per-fetch timeout in seconds
+    """
+
+    def __init__(self, pool_size=8, per_host=4, timeout=60):
+        self.pool = ThreadPool(minthreads=1, maxthreads=pool_size, name="cloudscraper")
+        self.per_host = per_host
+        self.timeout = timeout
+        self.host_semaphores = {}
+        self.local = threading.local()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('CLOUDSCRAPER_ENABLED'):
+            raise NotConfigured
+        try:
+            import cloudscraper  # noqa: F401
+        except ImportError:
+            raise NotConfigured("CLOUDSCRAPER_ENABLED is set but cloudscraper is not installed")
+        s = cls(
+            pool_size=settings.getint('CLOUDSCRAPER_POOL_SIZE', 8),
+            per_host=settings.getint('CLOUDSCRAPER_PER_HOST', 4),
+            timeout=settings.getfloat('CLOUDSCRAPER_TIMEOUT', 60),
+        )
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def spider_opened(self, spider):
+        self.pool.start()
+        spider.logger.info(
+            f"Cloudscraper pool started: {self.pool.max} threads, {self.per_host} per host"
+        )
+
+    def spider_closed(self, spider):
+        self.pool.stop()
+
+    def process_request(self, request, spider):
+        if should_bypass(request, spider):
             return None
 
-        cookies = request.cookies if request.cookies else None
+        from twisted.internet import reactor
+
+        host = urlparse(request.url).netloc
+        semaphore = self.host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self.host_semaphores[host] = DeferredSemaphore(self.per_host)
 
         spider.logger.info(f"Cloudscraper fetching: {request.url}")
-        # response = self.scraper.get(request.url, cookies=self.cookies)
-        response = self.scraper.get(request.url)
-        content_type = response.headers.get("Content-Type", "").lower()
-        body = response.content
-        
-
-        if "image" in content_type or request.url.endswith((".jpg", ".png", ".jpeg", ".gif", ".bmp", ".webp")):
-            return Response(
-                url=request.url,
-                status=response.status_code,
-                body=body,
-                request=request,
-            )
-        else:
-            return HtmlResponse(
-                url=request.url,
-                status=response.status_code,
-                body=body,
-                encoding='utf-8',
-                request=request,
-            )
+        cookies = dict(request.cookies) if isinstance(request.cookies, dict) else None
+        d = semaphore.run(deferToThreadPool, reactor, self.pool, self.fetch, request.url, cookies)
+        d.addCallback(lambda response: build_response(request, response))
+        return d
+
+    def fetch(self, url, cookies=None):
+        # Runs on a worker thread; sessions are not thread-safe so each
+        # worker keeps its own.
+        scraper = getattr(self.local, 'scraper', None)
+        if scraper is None:
+            scraper = self.local.scraper = create_scraper()
+        # Redirects go back through Scrapy (RedirectMiddleware, or the spider
+        # for requests that handle 3xx themselves)
+        return scraper.get(url, cookies=cookies, timeout=self.timeout, allow_redirects=False)
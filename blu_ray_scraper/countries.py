@@ -0,0 +1,62 @@
+# Country cookie values accepted by blu-ray.com, as used by the listing crawls
+COUNTRIES = [
+    'us', 'uk', 'ca', 'au', 'tr', 'za', 'id', 'mx', 'my', 'ph', 'sg', 'no',
+    'ua', 'ae', 'lv', 'lt', 'kr', 'it', 'in', 'il', 'ie', 'de', 'fr', 'es',
+    'ar', 'at', 'be', 'bg', 'br', 'cn', 'cz', 'ee', 'fi', 'hu', 'is', 'co',
+    'th', 'ch', 'cl', 'ro', 'nz', 'ru', 'gr', 'hk', 'nl', 'tw', 'jp', 'pt',
+    'pl', 'se', 'dk',
+]
+
+COUNTRY_NAMES = {
+    'us': 'USA',
+    'uk': 'United Kingdom',
+    'ca': 'Canada',
+    'au': 'Australia',
+    'tr': 'Turkey',
+    'za': 'South Africa',
+    'id': 'Indonesia',
+    'mx': 'Mexico',
+    'my': 'Malaysia',
+    'ph': 'Philippines',
+    'sg': 'Singapore',
+    'no': 'Norway',
+    'ua': 'Ukraine',
+    'ae': 'United Arab Emirates',
+    'lv': 'Latvia',
+    'lt': 'Lithuania',
+    'kr': 'South Korea',
+    'it': 'Italy',
+    'in': 'India',
+    'il': 'Israel',
+    'ie': 'Ireland',
+    'de': 'Germany',
+    'fr': 'France',
+    'es': 'Spain',
+    'ar': 'Argentina',
+    'at': 'Austria',
+    'be': 'Belgium',
+    'bg': 'Bulgaria',
+    'br': 'Brazil',
+    'cn': 'China',
+    'cz': 'Czech Republic',
+    'ee': 'Estonia',
+    'fi': 'Finland',
+    'hu': 'Hungary',
+    'is': 'Iceland',
+    'co': 'Colombia',
+    'th': 'Thailand',
+    'ch': 'Switzerland',
+    'cl': 'Chile',
+    'ro': 'Romania',
+    'nz': 'New Zealand',
+    'ru': 'Russia',
+    'gr': 'Greece',
+    'hk': 'Hong Kong',
+    'nl': 'Netherlands',
+    'tw': 'Taiwan',
+    'jp': 'Japan',
+    'pt': 'Portugal',
+    'pl': 'Poland',
+    'se': 'Sweden',
+    'dk': 'Denmark',
+}
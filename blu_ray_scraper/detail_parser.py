@@ -0,0 +1,284 @@
+"""
+Single-pass extraction of a blu-ray.com movie detail page.
+
+parse_detail_page() parses the page once with lxml and collects everything
+parse_movie_detail needs in one walk over the tree: the core info line,
+the specs and pricing cells, audio/subtitles, title, description and
+cast, genres, the links to the enrichment pages and the script text the
+cover URLs are pulled from. It replaces ~15 separate CSS/XPath queries
+and the re-parsing of the specs and pricing cells; its output is the same
+as theirs (benchmarks/detail_parser.py checks that on the fixtures).
+"""
+import re
+from urllib.parse import parse_qs, urlparse
+
+from lxml import etree
+
+HOME_URL = 'https://www.blu-ray.com/'
+CREDIT_MARKERS = ["Directors:", "Producers:", "Starring:", "Writers:", "Narrator:", "Director:", "Producer:"]
+CAST_ROLES = [
+    ("Director", ("Director:", "Directors:")),
+    ("Cast", ("Starring:",)),
+    ("Writer", ("Writers:", "Writer:")),
+    ("Producer", ("Producers:", "Producer:")),
+    ("Narrator", ("Narrator:", "Narrators:")),
+    ("Composer", ("Composer:", "Composers:")),
+]
+
+
+def parse_html(text):
+    # Same parser settings as parsel, so the tree matches response.selector's
+    body = text.strip().replace('\x00', '').encode('utf-8') or b'<html/>'
+    return etree.fromstring(body, parser=etree.HTMLParser(recover=True, encoding='utf-8'))
+
+
+def own_texts(el):
+    """Text nodes that are direct children of `el` (CSS ::text)."""
+    texts = [el.text] if el.text else []
+    texts.extend(child.tail for child in el if child.tail)
+    return texts
+
+
+def all_texts(el, br=None, texts=None):
+    """Every text node under `el` in document order (CSS ' ::text'); `br` stands in for <br> elements."""
+    if texts is None:
+        texts = []
+    if el.text and isinstance(el.tag, str):
+        texts.append(el.text)
+    for child in el:
+        if isinstance(child.tag, str):
+            if br is not None and child.tag == 'br':
+                texts.append(br)
+            all_texts(child, br, texts)
+        if child.tail:
+            texts.append(child.tail)
+    return texts
+
+
+def text_between(text, start_text, end_text=None):
+    start_idx = text.find(start_text)
+    if start_idx == -1:
+        return ""
+    end_idx = text.find(end_text, start_idx + len(start_text)) if end_text else -1
+    return text[start_idx + len(start_text):end_idx].strip() if end_idx != -1 else text[start_idx + len(start_text):].strip()
+
+
+def is_inside(el, ancestor):
+    return ancestor is not None and any(parent is ancestor for parent in el.iterancestors())
+
+
+def split_sections(cell, br=None):
+    """
+    {header: lines} of a specs/pricing cell, split at its .subheading
+    headers in one pass over the cell: the header positions are recorded
+    while the text is collected, so nothing is searched for afterwards.
+    A section runs from the end of its header to the start of the next one.
+    """
+    pieces = []
+    marks = []  # (header, start, end) offsets into the cell text
+    length = 0
+
+    def add(text, header):
+        nonlocal length
+        if header:
+            marks.append((text, length, length + len(text)))
+        pieces.append(text)
+        length += len(text)
+
+    def walk(el, header):
+        header = header or 'subheading' in el.get('class', '').split()
+        if el.text:
+            add(el.text, header)
+        for child in el:
+            if isinstance(child.tag, str):
+                if br is not None and child.tag == 'br':
+                    add(br, False)
+                walk(child, header)
+            if child.tail:
+                add(child.tail, header)
+
+    walk(cell, False)
+    text = ''.join(pieces)
+    sections = {}
+    for i, (header, start, end) in enumerate(marks):
+        next_start = marks[i + 1][1] if i + 1 < len(marks) else len(text)
+        sections.setdefault(header, text[end:next_start].strip().split('\n'))
+    return sections
+
+
+def parse_specs(td):
+    specs = {}
+    for current, lines in split_sections(td, br='\n').items():
+        if current in ['Video']:
+            for line in lines:
+                if 'Codec' in line:
+                    specs['codec'] = line.split(':', 1)[-1].strip()
+                elif 'Encoding' in line:
+                    specs['encoding'] = line.split(':', 1)[-1].strip()
+                elif 'Resolution' in line:
+                    specs['resolution'] = line.split(':', 1)[-1].strip()
+                elif 'Aspect ratio' in line:
+                    specs['aspect_ratio'] = line.split(':', 1)[-1].strip()
+                elif 'Original aspect ratio' in line:
+                    specs['original_aspect_ratio'] = line.split(':', 1)[-1].strip()
+        elif current in ['Discs', 'Disc']:
+            specs['discs'] = lines
+        elif current == 'Playback':
+            specs['playback'] = lines
+        elif current == 'Packaging':
+            specs['packaging'] = lines
+    return specs
+
+
+def parse_cast_lines(info_text):
+    # Credits listed on the detail page itself (no cast & crew tab)
+    cast = {}
+    key = None
+    for line in info_text:
+        changed_now = False
+        for role, markers in CAST_ROLES:
+            if any(marker in line for marker in markers):
+                key = role
+                changed_now = True
+                break
+        if key:
+            if changed_now: continue
+            if '»' in line: continue
+            if 'cast & crew' in line: continue
+            if ',' in line: continue
+            if ':' in line: continue
+            if key in cast:
+                cast[key].append({line.split(":", 1)[-1].strip()})
+            else:
+                cast[key] = [line.split(":", 1)[-1].strip()]
+    return cast
+
+
+def parse_detail_page(text, home_url=HOME_URL):
+    """
+    (details, links) of a detail page. details holds the record fields in
+    the order parse_movie_detail adds them; links has 'home' (a link to
+    `home_url`, the blank / blocked page check), the 'cast_crew',
+    'screenshots', 'amazon' and 'ebay' hrefs and the page's 'scripts' text.
+    """
+    root = parse_html(text)
+
+    core_info = []
+    core_last = genre_last = None
+    specs_td = pricing_td = movie_info = None
+    audio, subs, genres, scripts = [], [], [], []
+    subheading_title = None
+    links = {'home': False, 'cast_crew': None, 'screenshots': None, 'amazon': None, 'ebay': None}
+
+    for el in root.iter(etree.Element):
+        tag = el.tag
+        attrib = el.attrib
+        classes = attrib['class'].split() if 'class' in attrib else ()
+
+        if tag == 'a':
+            href = attrib.get('href')
+            if href is not None:
+                if href == home_url:
+                    links['home'] = True
+                if links['cast_crew'] is None and '#Castandcrew' in href:
+                    links['cast_crew'] = href
+                if links['screenshots'] is None and '#Screenshots' in href:
+                    links['screenshots'] = href
+                if links['ebay'] is None and '/sch/i.html?_nkw=' in href:
+                    links['ebay'] = href
+        elif tag == 'td':
+            width = attrib.get('width')
+            if specs_td is None and width == '228px':
+                specs_td = el
+            elif pricing_td is None and width == '266px':
+                pricing_td = el
+        elif tag == 'script':
+            scripts.extend(own_texts(el))
+
+        el_id = attrib.get('id')
+        if el_id == 'movie_buylink' and links['amazon'] is None:
+            links['amazon'] = attrib.get('href')
+        elif el_id == 'longaudio':
+            audio.extend(own_texts(el))
+        elif el_id == 'longsubs':
+            subs.extend(own_texts(el))
+        elif el_id == 'movie_info' and movie_info is None:
+            movie_info = el
+
+        if classes:
+            if tag == 'span' and 'subheading' in classes and 'grey' in classes and not is_inside(el, core_last):
+                core_info.extend(all_texts(el))
+                core_last = el
+            if 'genreappeal' in classes and not is_inside(el, genre_last):
+                genres.extend(all_texts(el))
+                genre_last = el
+            if subheading_title is None and 'subheadingtitle' in classes:
+                texts = own_texts(el)
+                if texts:
+                    subheading_title = texts[0]
+
+    details = {}
+
+    core_info = ' '.join(t.strip() for t in core_info if t.strip())
+    core_texts = [t.strip() for t in core_info.split('|')] if core_info else []
+    details["production"] = ""
+    for text in core_texts:
+        if re.fullmatch(r"\d{4}(-\d{4})?", text):
+            details["production_year"] = text
+        elif 'min' in text:
+            details["runtime"] = text
+        elif 'rated' in text.lower():
+            details["age_rating"] = text
+        elif re.fullmatch(r"[A-Za-z]+ \d{2}, \d{4}", text):
+            details["release_date"] = text
+        elif not details["production"]:
+            details["production"] = text
+
+    if specs_td is not None:
+        details.update(parse_specs(specs_td))
+
+    audio_text = ", ".join([line.strip() for line in audio if line.strip()])
+    details['audio'] = audio_text.replace(', (, )', '').replace('("less")', '').replace('(, )', '')
+    subs_text = ", ".join([s.strip() for s in subs if s.strip()])
+    details['subtitles'] = subs_text.replace(', (, )', '').replace('("less")', '').replace('(, )', '')
+
+    if pricing_td is not None:
+        pricing_lines = split_sections(pricing_td).get("Price")
+        if pricing_lines is None:
+            # No "Price" header: the text between the first two mentions of it
+            pricing_lines = text_between(''.join(all_texts(pricing_td)), "Price", "Price").split('\n')
+        for line in pricing_lines:
+            if 'Used' in line:
+                details['used_price'] = line.split("$")[-1].strip().split()[0]
+            elif 'New' in line:
+                details['new_price'] = line.split("$")[-1].strip().split()[0]
+
+    title = ""
+    info_text = []
+    if movie_info is not None:
+        for h3 in movie_info.iter('h3'):
+            texts = own_texts(h3)
+            if texts:
+                title = texts[0]
+                break
+        info_text = [line.strip() for line in all_texts(movie_info) if line.strip() and "Screenshots" not in line]
+    details['title'] = title.strip()
+    details['subheading_title'] = (subheading_title or "").strip()
+
+    description_lines = []
+    for line in info_text[1:]:
+        if any(x in line for x in CREDIT_MARKERS):
+            break
+        description_lines.append(line)
+    details["description"] = "\n".join(description_lines)
+
+    if not links['cast_crew']:
+        details['cast_and_crew2'] = parse_cast_lines(info_text)
+
+    details['genres'] = [g.strip() for g in genres[:3] if g.strip()]
+
+    if links['ebay']:
+        details['upc'] = parse_qs(urlparse(links['ebay']).query).get('_nkw', [''])[0]
+
+    links['scripts'] = "\n".join(scripts)
+    return details, links
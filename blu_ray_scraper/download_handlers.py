@@ -0,0 +1,25 @@
+from twisted.internet import defer
+
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler
+from scrapy.exceptions import IgnoreRequest
+
+
+class CancellableHTTPDownloadHandler(HTTP11DownloadHandler):
+    """
+    Scrapy's HTTP handler, asking spider.is_cancelled(request) once more
+    right before the request goes out.
+
+    CancelledRequestMiddleware only sees a request when it enters the
+    downloader. From there it can wait a long time in its slot's queue
+    (blu-ray.com runs at one request a second, with up to
+    CONCURRENT_REQUESTS queued), and the spider may give up on it
+    meanwhile, e.g. listing pages past a count that has just shrunk. Those
+    fail with IgnoreRequest here instead of being downloaded.
+    """
+
+    def download_request(self, request, spider):
+        is_cancelled = getattr(spider, 'is_cancelled', None)
+        if is_cancelled is not None and is_cancelled(request):
+            spider.crawler.stats.inc_value('cancelled_requests')
+            return defer.fail(IgnoreRequest(f"Cancelled by the spider: {request.url}"))
+        return super().download_request(request, spider)
@@ -0,0 +1,84 @@
+import time
+
+
+class MovieJoin:
+    """
+    Fan-out/join state for one movie.
+
+    Once the detail page is parsed, the spider issues every independent
+    enrichment branch (screenshots page, cast & crew page, price lookup)
+    at the same time and hands each request this object in meta. Each
+    branch reports back through complete(); the branch that finishes last
+    gets the merged item back and yields it. Branch requests are given
+    download_timeout=remaining() so a slow branch fails (and is completed
+    empty by the errback) instead of holding the item past the deadline.
+
+    start() arms a reactor timer for the deadline as well, since a branch
+    can chain several requests (the price lookup) or wait in the scheduler
+    long before its download timeout starts. If branches are still pending
+    when it fires, they are given up (timed_out) and on_timeout(join) gets
+    to emit the partial item; branches that report back later are ignored.
+    """
+
+    def __init__(self, movie_details, branches, timeout=180, key=None):
+        self.movie_details = movie_details
+        self.key = key
+        self.pending = set(branches)
+        self.deadline = time.monotonic() + timeout
+        self.emitted = False
+        self.timed_out = False
+        self.timer = None
+
+    def remaining(self, minimum=5):
+        return max(self.deadline - time.monotonic(), minimum)
+
+    def start(self, on_timeout):
+        if not self.pending or self.emitted:
+            return
+        from twisted.internet import reactor
+        self.timer = reactor.callLater(self.remaining(minimum=0), self.expire, on_timeout)
+
+    def expire(self, on_timeout):
+        self.timer = None
+        if self.emitted:
+            return
+        self.emitted = self.timed_out = True
+        on_timeout(self)
+
+    def complete(self, branch, data=None):
+        if self.emitted:
+            return None
+        if data:
+            self.movie_details.update(data)
+        self.pending.discard(branch)
+        if self.pending:
+            return None
+        self.emitted = True
+        if self.timer is not None and self.timer.active():
+            self.timer.cancel()
+        self.timer = None
+        return self.movie_details
+
+
+class SingleFlight:
+    """
+    In-flight de-duplication of lookups that many movies share, e.g. one
+    eBay search per UPC. The first waiter for a key issues the request;
+    later ones just queue up until release() hands the whole list to the
+    callback (or errback) that finishes them.
+    """
+
+    def __init__(self):
+        self.waiting = {}
+
+    def join(self, key, waiter):
+        """Queue `waiter` for `key`; True when it's the first, so the caller should issue the lookup."""
+        waiters = self.waiting.setdefault(key, [])
+        waiters.append(waiter)
+        return len(waiters) == 1
+
+    def release(self, key):
+        return self.waiting.pop(key, [])
+
+    def __len__(self):
+        return len(self.waiting)
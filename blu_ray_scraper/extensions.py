@@ -0,0 +1,173 @@
+import time
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.httpobj import urlparse_cached
+
+from blu_ray_scraper.middlewares import host_delay_changed
+
+
+class SlotControl:
+    """Learned rate of one download slot: concurrency when delay is 0, else the delay."""
+
+    def __init__(self, key, concurrency, delay, limits):
+        self.key = key
+        self.concurrency = concurrency
+        self.delay = delay
+        self.min_concurrency = limits.get('min_concurrency', 1)
+        self.max_concurrency = limits.get('max_concurrency', 16)
+        self.min_delay = limits.get('min_delay', 0)
+        self.max_delay = limits.get('max_delay', 10)
+        self.latency = None
+        self.best_latency = None
+        self.successes = 0
+        self.last_decrease = 0
+        # The downloader slot the limits were last applied to
+        self.slot = None
+        # HostHealthMiddleware's backoff: slot.delay never goes below it
+        self.host_delay = 0
+        self.host_paused = False
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD controller for each download slot (one per domain, plus named slots
+    like amazon-redirect), replacing a single global DOWNLOAD_DELAY.
+
+    Every downloaded response updates the slot's latency average. A server
+    error, a 403/429 or a latency above ADAPTIVE_LATENCY_FACTOR times the
+    best latency seen is congestion: the slot's rate is cut multiplicatively
+    (halve the concurrency, or double the delay once it is down to the
+    minimum concurrency), at most once per latency period. Otherwise the
+    rate grows additively (shrink the delay by ADAPTIVE_DELAY_STEP, then one
+    more concurrent request) after every round of `concurrency` successes.
+
+    Limits and starting points per domain come from ADAPTIVE_DOMAINS, e.g.
+    the image CDN can be allowed far more concurrency than the HTML site.
+
+    This is the only writer of slot.delay and slot.concurrency. The learned
+    state is kept per slot key and reapplied whenever the downloader drops
+    an idle slot and recreates it with its defaults. HostHealthMiddleware's
+    403/429 backoff arrives through the host_delay_changed signal as a
+    floor for the delay; slots it has paused are not tuned until they
+    recover. The learned state is in the stats as adaptive/<slot>/*.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_ENABLED'):
+            raise NotConfigured
+        self.crawler = crawler
+        self.domains = settings.getdict('ADAPTIVE_DOMAINS')
+        self.defaults = {
+            'concurrency': settings.getint('ADAPTIVE_START_CONCURRENCY', 2),
+            'delay': settings.getfloat('ADAPTIVE_START_DELAY', 1.0),
+            'min_concurrency': 1,
+            'max_concurrency': settings.getint('ADAPTIVE_MAX_CONCURRENCY', 16),
+            'min_delay': 0,
+            'max_delay': settings.getfloat('ADAPTIVE_MAX_DELAY', 10),
+        }
+        self.latency_factor = settings.getfloat('ADAPTIVE_LATENCY_FACTOR', 3.0)
+        self.delay_step = settings.getfloat('ADAPTIVE_DELAY_STEP', 0.1)
+        self.slots = {}
+
+        crawler.signals.connect(self.request_reached_downloader, signal=signals.request_reached_downloader)
+        crawler.signals.connect(self.response_downloaded, signal=signals.response_downloaded)
+        crawler.signals.connect(self.host_delay_changed, signal=host_delay_changed)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def limits(self, key):
+        limits = dict(self.defaults)
+        limits.update(self.domains.get(key, {}))
+        return limits
+
+    def get_slot(self, request):
+        if urlparse_cached(request).scheme not in ('http', 'https'):
+            # Nothing goes over the network (e.g. the data: requests that emit timed-out items)
+            return None, None
+        downloader = self.crawler.engine.downloader
+        key = downloader.get_slot_key(request)
+        return key, downloader.slots.get(key)
+
+    def control(self, key):
+        control = self.slots.get(key)
+        if control is None:
+            limits = self.limits(key)
+            control = self.slots[key] = SlotControl(key, limits['concurrency'], limits['delay'], limits)
+        return control
+
+    def request_reached_downloader(self, request, spider):
+        key, slot = self.get_slot(request)
+        if slot is None:
+            return
+        control = self.control(key)
+        if control.slot is not slot:
+            # A new slot, or one the downloader recreated after dropping it while idle
+            self.apply(control, slot)
+
+    def host_delay_changed(self, key, delay, paused):
+        control = self.control(key)
+        control.host_delay = delay
+        control.host_paused = paused
+        slot = self.crawler.engine.downloader.slots.get(key)
+        if slot is not None:
+            self.apply(control, slot)
+
+    def response_downloaded(self, response, request, spider):
+        key, slot = self.get_slot(request)
+        control = self.slots.get(key)
+        if slot is None or control is None:
+            return
+        if control.host_paused:
+            return
+
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            control.latency = latency if control.latency is None else 0.8 * control.latency + 0.2 * latency
+            control.best_latency = latency if control.best_latency is None else min(control.best_latency, latency)
+
+        congested = response.status >= 500 or response.status in (403, 429) or (
+            latency is not None and latency > self.latency_factor * control.best_latency
+        )
+        if congested:
+            self.decrease(control, slot)
+        else:
+            control.successes += 1
+            if control.successes >= control.concurrency:
+                self.increase(control, slot)
+
+    def decrease(self, control, slot):
+        now = time.monotonic()
+        # One cut per latency period, or a burst of slow responses collapses the rate
+        if now - control.last_decrease < max(control.latency or 0, control.delay, 1):
+            return
+        control.last_decrease = now
+        control.successes = 0
+        if control.concurrency > control.min_concurrency:
+            control.concurrency = max(control.concurrency // 2, control.min_concurrency)
+        else:
+            control.delay = min(max(control.delay * 2, self.delay_step), control.max_delay)
+        self.apply(control, slot)
+
+    def increase(self, control, slot):
+        control.successes = 0
+        if control.delay > control.min_delay:
+            control.delay = max(control.delay - self.delay_step, control.min_delay)
+        elif control.concurrency < control.max_concurrency:
+            control.concurrency += 1
+        else:
+            return
+        self.apply(control, slot)
+
+    def apply(self, control, slot):
+        control.slot = slot
+        slot.concurrency = control.concurrency
+        slot.delay = max(control.delay, control.host_delay)
+        stats = self.crawler.stats
+        stats.set_value(f'adaptive/{control.key}/concurrency', control.concurrency)
+        stats.set_value(f'adaptive/{control.key}/delay', round(control.delay, 3))
+        if control.latency is not None:
+            stats.set_value(f'adaptive/{control.key}/latency_ms', int(control.latency * 1000))
@@ -0,0 +1,239 @@
+import json
+import os
+import time
+from collections import defaultdict
+
+from blu_ray_scraper.item_store import json_default
+from blu_ray_scraper.known_titles import title_id
+
+
+class TitleFrontier:
+    """
+    Shared dedupe frontier for a crawl over several listings (one per format).
+
+    Listing pages report every title they link to with add(). Each title is
+    released for detail scraping exactly once, as soon as it is first seen,
+    tagged with the listings it has appeared in so far. Listings that report
+    it later only add to its tags (the spider writes them to the catalog's
+    membership table as each listing page is parsed), they don't hold the
+    detail request back.
+
+    Titles and listings changed since the last changes() call are tracked,
+    so a checkpoint can save just those.
+    """
+
+    def __init__(self):
+        self.titles = {}
+        self.pending = defaultdict(dict)
+        self.page_counts = {}
+        self.pages_done = defaultdict(set)
+        self.pages_failed = set()
+        self.changed_titles = set()
+        self.changed_listings = set()
+        # Released titles not seen in the catalog yet
+        self.unfinished = set()
+
+    def add(self, key, url, year, listing):
+        title = self.titles.get(key)
+        if title is None:
+            title = self.titles[key] = {'url': url, 'year': year, 'listings': set()}
+            self.pending[title['year']][key] = title
+        if listing not in title['listings']:
+            title['listings'].add(listing)
+            self.changed_titles.add(key)
+
+    def set_page_count(self, year, listing, total_pages):
+        self.page_counts[(year, listing)] = max(total_pages, 1)
+        self.changed_listings.add((year, listing))
+
+    def page_done(self, year, listing, page, failed=False):
+        self.pages_done[(year, listing)].add(page)
+        self.changed_listings.add((year, listing))
+        if failed:
+            # Done for this run (so the year can still be released), fetched again on resume
+            self.pages_failed.add((year, listing, page))
+
+    def listing_complete(self, year, listing):
+        total = self.page_counts.get((year, listing))
+        # Pages past the real count may have been issued from a stale cached count
+        return total is not None and self.pages_done[(year, listing)].issuperset(range(total))
+
+    def listing_failed(self, year, listing):
+        total = self.page_counts.get((year, listing), 0)
+        return any((year, listing, page) in self.pages_failed for page in range(total))
+
+    def release(self, year):
+        """(key, title) pairs of `year` added since the last call, for detail scraping."""
+        released = list(self.pending.pop(year, {}).items())
+        for key, _ in released:
+            self.changed_titles.add(key)
+            self.unfinished.add(key)
+        return released
+
+    def released(self):
+        """Keys handed out for detail scraping."""
+        waiting = {key for titles in self.pending.values() for key in titles}
+        return [key for key in self.titles if key not in waiting]
+
+    def title_row(self, key):
+        title = self.titles[key]
+        released = key not in self.pending.get(title['year'], ())
+        return [key, title['url'], title['year'], sorted(title['listings']), released]
+
+    def listing_rows(self, listings):
+        # Complete rows, not increments: a delta's row replaces the loaded one
+        page_counts, pages_done = [], []
+        for year, listing in listings:
+            total = self.page_counts.get((year, listing))
+            if (year, listing, 0) in self.pages_failed:
+                # Counted from a stale cache; page 0 is fetched again on resume
+                total = None
+            page_counts.append([year, list(listing), total])
+            pages = self.pages_done.get((year, listing), ())
+            pages_done.append([year, list(listing), sorted(page for page in pages if (year, listing, page) not in self.pages_failed)])
+        return page_counts, pages_done
+
+    def state(self, done=()):
+        """JSON-able snapshot; titles in `done` are already in the catalog and left out."""
+        self.changes(done)
+        page_counts, pages_done = self.listing_rows(set(self.page_counts) | set(self.pages_done))
+        return {
+            'titles': [self.title_row(key) for key in self.titles if key not in done],
+            'page_counts': page_counts,
+            'pages_done': pages_done,
+        }
+
+    def changes(self, done=()):
+        """
+        What changed since the last call, in the state() layout, plus the
+        released titles that have since made it into `done`.
+        """
+        finished = [key for key in self.unfinished if key in done]
+        self.unfinished.difference_update(finished)
+        page_counts, pages_done = self.listing_rows(self.changed_listings)
+        delta = {
+            'titles': [self.title_row(key) for key in self.changed_titles if key not in done],
+            'page_counts': page_counts,
+            'pages_done': pages_done,
+            'done': finished,
+        }
+        self.changed_titles = set()
+        self.changed_listings = set()
+        return delta
+
+    def restore(self, state):
+        """Apply a state() snapshot or a changes() delta on top of what is loaded."""
+        for key, url, year, listings, was_released in state.get('titles', []):
+            # Checkpoints from before titles were keyed by section carry bare numeric IDs
+            key = title_id(url) or url
+            title = self.titles[key] = {'url': url, 'year': year, 'listings': {tuple(l) for l in listings}}
+            if was_released:
+                self.pending[year].pop(key, None)
+                self.unfinished.add(key)
+            else:
+                self.pending[year][key] = title
+        for key in state.get('done', []):
+            title = self.titles.pop(key, None)
+            if title is not None:
+                self.pending[title['year']].pop(key, None)
+            self.unfinished.discard(key)
+        for year, listing, total in state.get('page_counts', []):
+            if total is None:
+                self.page_counts.pop((year, tuple(listing)), None)
+            else:
+                self.page_counts[(year, tuple(listing))] = total
+        for year, listing, pages in state.get('pages_done', []):
+            self.pages_done[(year, tuple(listing))] = set(pages)
+
+    def missing_pages(self, year, listing):
+        """Listing pages of `year` still to fetch; page 0 until the page count is known."""
+        total = self.page_counts.get((year, listing))
+        if total is None:
+            return [0]
+        done = self.pages_done[(year, listing)]
+        return [page for page in range(total) if page not in done]
+
+
+class FrontierCheckpoint:
+    """
+    On-disk checkpoint of a crawl: the frontier (listing pages done, titles
+    seen and released) and the enrichment branches already finished for
+    titles that aren't in the catalog yet.
+
+    The file is JSON lines: a full snapshot, then one line per save() with
+    only what changed since the previous one, so a periodic save costs
+    about as much as the crawl progress since the last, not the size of
+    the frontier. compact() rewrites it as a single snapshot with an atomic
+    replace (the spider does that when it closes). A crash halfway through
+    an append leaves a torn last line, which load() skips.
+
+    Save only after the catalog has been committed: anything the
+    checkpoint calls done must already be on disk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hops = {}
+        self.changed_hops = set()
+        self.synced = False
+
+    def load(self, frontier):
+        """Restore `frontier` from disk; returns the released keys (empty when there is no checkpoint)."""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    state = json.loads(line)
+                except ValueError:
+                    # Torn last append
+                    break
+                if 'frontier' in state:
+                    self.hops = state.get('hops', {})
+                    frontier.restore(state['frontier'])
+                else:
+                    self.hops.update(state.get('hops', {}))
+                    for key in state.get('done', []):
+                        self.hops.pop(key, None)
+                    frontier.restore(state)
+        # Only changes from here on need saving
+        frontier.changes()
+        self.synced = True
+        return frontier.released()
+
+    def hop_done(self, key, branch, data):
+        self.hops.setdefault(str(key), {})[branch] = data or {}
+        self.changed_hops.add(str(key))
+
+    def hops_for(self, key):
+        return self.hops.get(str(key), {})
+
+    def save(self, frontier, done=()):
+        """Append what changed since the last save (everything, the first time)."""
+        if not self.synced:
+            return self.compact(frontier, done)
+        delta = frontier.changes(done)
+        for key in delta['done']:
+            self.hops.pop(key, None)
+        delta['hops'] = {key: self.hops[key] for key in self.changed_hops if key in self.hops}
+        delta['saved_at'] = time.time()
+        self.changed_hops = set()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(delta, ensure_ascii=False, default=json_default) + '\n')
+
+    def compact(self, frontier, done=()):
+        """Rewrite the checkpoint as one full snapshot."""
+        self.hops = {key: hops for key, hops in self.hops.items() if key not in done}
+        self.changed_hops = set()
+        state = {'frontier': frontier.state(done), 'hops': self.hops, 'saved_at': time.time()}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(state, ensure_ascii=False, default=json_default) + '\n')
+        os.replace(tmp_path, self.path)
+        self.synced = True
+
+    def clear(self):
+        self.synced = False
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,123 @@
+import io
+import json
+import os
+import re
+
+try:
+    import zstandard
+except ImportError:  # only needed for .zst stores
+    zstandard = None
+
+BLU_RAY_URL_RE = re.compile(r'"blu_ray_url":\s*"([^"]*)"')
+
+
+def json_default(value):
+    # Scraped values occasionally contain sets (e.g. cast_and_crew2 entries)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JsonlItemStore:
+    """
+    Append-only item store, one JSON object per line.
+
+    Spiders append items as they are scraped and never rewrite the file;
+    readers stream it line by line, so memory stays flat however large the
+    catalog grows. Paths ending in .zst are zstd-compressed (one frame per
+    writing session) and need the optional zstandard package.
+    """
+
+    def __init__(self, path, flush_every=100):
+        self.path = path
+        self.flush_every = flush_every
+        self.compressed = path.endswith('.zst')
+        self._raw = None
+        self._writer = None
+        self._pending = 0
+
+        if self.compressed and zstandard is None:
+            raise RuntimeError(f"zstandard is required for compressed item store {path}")
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def open(self):
+        if self._writer is not None:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if self.compressed:
+            self._raw = open(self.path, 'ab')
+            self._writer = zstandard.ZstdCompressor().stream_writer(self._raw)
+        else:
+            self._writer = open(self.path, 'a', encoding='utf-8')
+
+    def append(self, item):
+        self.open()
+        line = json.dumps(item, ensure_ascii=False, default=json_default) + '\n'
+        if self.compressed:
+            self._writer.write(line.encode('utf-8'))
+        else:
+            self._writer.write(line)
+
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self._writer is None:
+            return
+        if self.compressed:
+            self._writer.flush(zstandard.FLUSH_BLOCK)
+        else:
+            self._writer.flush()
+        self._pending = 0
+
+    def close(self):
+        if self._writer is None:
+            return
+        if self.compressed:
+            self._writer.flush(zstandard.FLUSH_FRAME)
+            self._raw.close()
+        else:
+            self._writer.close()
+        self._writer = self._raw = None
+        self._pending = 0
+
+    def lines(self):
+        if not self.exists():
+            return
+        if self.compressed:
+            with open(self.path, 'rb') as fh:
+                reader = zstandard.ZstdDecompressor().stream_reader(fh, read_across_frames=True)
+                yield from io.TextIOWrapper(reader, encoding='utf-8')
+        else:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                yield from f
+
+    def __iter__(self):
+        for line in self.lines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a half-written last line behind
+                continue
+
+    def iter_urls(self):
+        """blu_ray_url of every record, without decoding the rest of the line."""
+        for line in self.lines():
+            match = BLU_RAY_URL_RE.search(line)
+            if match:
+                yield match.group(1)
+
+
+def iter_items(path):
+    """Records of a data file: streamed for .jsonl(.zst) stores, loaded for legacy .json arrays."""
+    if path.endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+    else:
+        yield from JsonlItemStore(path)
@@ -0,0 +1,14 @@
+import re
+
+TITLE_ID_RE = re.compile(r'(?:^|/)(movies|dvd)/(?:[^/?#]+/)?(\d+)/?(?:[?#].*)?$')
+
+
+def title_id(url):
+    """
+    Key of a movie URL: its blu-ray.com section and numeric ID, e.g.
+    .../movies/Heat-Blu-ray/2343/ -> 'movies/2343'. The Blu-ray (movies/)
+    and DVD (dvd/) sections number their titles independently, so the ID
+    alone isn't unique. A key maps to itself.
+    """
+    match = TITLE_ID_RE.search(url or '')
+    return f'{match.group(1)}/{int(match.group(2))}' if match else None
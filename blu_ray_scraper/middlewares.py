@@ -102,11 +102,249 @@ class BluRayScraperDownloaderMiddleware:
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
 
-from scrapy.exceptions import CloseSpider
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from scrapy.exceptions import IgnoreRequest
+
+# Sent by HostHealthMiddleware with (key, delay, paused) when a slot's backoff
+# changes and another component owns slot.delay (see AdaptiveConcurrency)
+host_delay_changed = object()
+
+
+class HostHealth:
+    """Block history and pause/circuit state of one host."""
+
+    def __init__(self, host):
+        self.host = host
+        self.state = 'ok'  # ok -> paused -> tripped
+        self.blocks = deque()
+        self.slot_key = None
+        self.base_delay = None
+        self.delay = None
+        self.probe_from = 0
+        self.failed_probes = 0
+        self.tripped_until = 0
+
+
+class HostHealthMiddleware:
+    """
+    Per-host health controller (replaces StopOn403Middleware, which closed
+    the whole spider on the first 403 from any host).
+
+    A 403/429 only ever affects the download slot of the host that sent it:
+
+    - every block doubles the slot's delay (it decays back on successes),
+      or raises it to the response's Retry-After if that is longer;
+    - HOSTHEALTH_BURST blocks within HOSTHEALTH_WINDOW seconds pause the
+      host: the slot delay is raised to the pause length, so at most one
+      request goes out per pause and it doubles as the recovery probe;
+    - a successful probe restores the slot, a failed one doubles the pause
+      (up to HOSTHEALTH_MAX_PAUSE);
+    - HOSTHEALTH_TRIP_AFTER failed probes in a row trip the circuit breaker:
+      requests to that host are dropped with IgnoreRequest (their errbacks
+      run as for any failed download) for HOSTHEALTH_TRIP_COOLDOWN seconds,
+      then a single probe is let through again.
+
+    Hosts the crawl can't do without (HOSTHEALTH_CRITICAL_HOSTS) close the
+    spider when they trip instead, so the frontier checkpoint is saved and
+    the crawl can be resumed later.
+
+    With ADAPTIVE_ENABLED, AdaptiveConcurrency is the only component that
+    writes slot.delay: the delays above are sent to it as a floor with the
+    host_delay_changed signal, and it keeps the slot at or above that floor
+    (and leaves paused slots alone). Without it the delays are set here.
+
+    403 and 429 are left out of RETRY_HTTP_CODES: RetryMiddleware would
+    send them straight back. They are retried from here instead, up to
+    HOSTHEALTH_MAX_RETRIES times, through the scheduler and so through the
+    slowed-down slot. Requests to a tripped host aren't retried.
+    """
+    BLOCK_CODES = (403, 429)
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.window = settings.getfloat('HOSTHEALTH_WINDOW', 60)
+        self.burst = settings.getint('HOSTHEALTH_BURST', 3)
+        self.pause = settings.getfloat('HOSTHEALTH_PAUSE', 30)
+        self.max_pause = settings.getfloat('HOSTHEALTH_MAX_PAUSE', 600)
+        self.max_delay = settings.getfloat('HOSTHEALTH_MAX_DELAY', 10)
+        self.trip_after = settings.getint('HOSTHEALTH_TRIP_AFTER', 5)
+        self.trip_cooldown = settings.getfloat('HOSTHEALTH_TRIP_COOLDOWN', 1800)
+        self.max_retries = settings.getint('HOSTHEALTH_MAX_RETRIES', 5)
+        self.critical_hosts = set(settings.getlist('HOSTHEALTH_CRITICAL_HOSTS'))
+        self.owns_delay = not settings.getbool('ADAPTIVE_ENABLED')
+        self.hosts = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def health(self, request):
+        host = urlparse(request.url).hostname or ''
+        health = self.hosts.get(host)
+        if health is None:
+            health = self.hosts[host] = HostHealth(host)
+        return health
+
+    def slot(self, health, request):
+        downloader = self.crawler.engine.downloader
+        health.slot_key = downloader.get_slot_key(request)
+        slot = downloader.slots.get(health.slot_key)
+        if health.base_delay is None:
+            if not self.owns_delay:
+                # A floor on top of AdaptiveConcurrency's own delay
+                health.base_delay = health.delay = 0
+            elif slot is not None:
+                health.base_delay = health.delay = slot.delay
+        return slot
+
+    def set_delay(self, health, slot, delay):
+        health.delay = delay
+        if not self.owns_delay:
+            self.crawler.signals.send_catch_log(
+                signal=host_delay_changed, key=health.slot_key, delay=delay, paused=health.state != 'ok'
+            )
+        elif slot is not None:
+            slot.delay = delay
+
+    def process_request(self, request, spider):
+        health = self.health(request)
+        if health.state == 'ok':
+            return None
+
+        now = time.monotonic()
+        if health.state == 'tripped':
+            if now < health.tripped_until:
+                self.crawler.stats.inc_value(f'hosthealth/{health.host}/ignored')
+                raise IgnoreRequest(f"Circuit open for {health.host}")
+            # Half-open: one more failed probe trips it again
+            spider.logger.info(f"[hosthealth] {health.host}: cooldown over, probing")
+            health.state = 'paused'
+            health.failed_probes = self.trip_after - 1
+            health.probe_from = now
+
+        # The downloader drops idle slots; make sure a recreated one is still paused
+        # (AdaptiveConcurrency keeps the floor per slot key and reapplies it itself)
+        slot = self.slot(health, request)
+        if self.owns_delay and slot is not None and slot.delay < health.delay:
+            self.set_delay(health, slot, health.delay)
+        return None
 
-class StopOn403Middleware:
     def process_response(self, request, response, spider):
-        if response.status == 403:
-            spider.logger.warning(f"403 Forbidden received. Closing spider: {spider.name}")
-            raise CloseSpider(reason="403 Forbidden")
+        health = self.health(request)
+        slot = self.slot(health, request)
+        if response.status in self.BLOCK_CODES:
+            self.blocked(health, slot, response, spider)
+            return self.retry(health, request, response, spider)
+        if response.status < 400:
+            self.succeeded(health, slot, spider)
         return response
+
+    def retry(self, health, request, response, spider):
+        retries = request.meta.get('hosthealth_retries', 0)
+        if (health.state == 'tripped' or retries >= self.max_retries or request.meta.get('dont_retry')
+                or response.status in request.meta.get('handle_httpstatus_list', ())):
+            return response
+        self.crawler.stats.inc_value(f'hosthealth/{health.host}/retries')
+        spider.logger.debug(f"[hosthealth] Retrying {request.url} after a {response.status} ({retries + 1}/{self.max_retries})")
+        retry = request.replace(dont_filter=True)
+        retry.meta['hosthealth_retries'] = retries + 1
+        return retry
+
+    def retry_after(self, response):
+        """Seconds asked for by the Retry-After header (delta or HTTP date), 0 without one."""
+        value = (response.headers.get('Retry-After') or b'').decode('latin-1').strip()
+        if not value:
+            return 0
+        if value.isdigit():
+            seconds = int(value)
+        else:
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return 0
+        return min(max(seconds, 0), self.max_pause)
+
+    def blocked(self, health, slot, response, spider):
+        now = time.monotonic()
+        retry_after = self.retry_after(response)
+        self.crawler.stats.inc_value(f'hosthealth/{health.host}/{response.status}')
+        health.blocks.append(now)
+        while health.blocks and health.blocks[0] < now - self.window:
+            health.blocks.popleft()
+
+        if health.state == 'ok':
+            if len(health.blocks) >= self.burst:
+                pause = max(self.pause, retry_after)
+                health.state = 'paused'
+                health.probe_from = now + pause
+                self.crawler.stats.inc_value(f'hosthealth/{health.host}/paused')
+                spider.logger.warning(
+                    f"[hosthealth] {health.host}: {len(health.blocks)} blocks in {self.window:.0f}s, pausing for {pause:.0f}s"
+                )
+                self.set_delay(health, slot, pause)
+            else:
+                self.set_delay(health, slot, max(min(max((health.delay or 0) * 2, 1), self.max_delay), retry_after))
+        elif health.state == 'paused' and now >= health.probe_from:
+            # Anything answered before probe_from was already in flight when we paused
+            health.failed_probes += 1
+            if health.failed_probes >= self.trip_after:
+                self.trip(health, slot, spider)
+            else:
+                pause = max(min(max(health.delay, self.pause) * 2, self.max_pause), retry_after)
+                health.probe_from = now + pause
+                spider.logger.warning(f"[hosthealth] {health.host}: probe blocked, pausing for {pause:.0f}s")
+                self.set_delay(health, slot, pause)
+
+    def succeeded(self, health, slot, spider):
+        if health.state == 'paused':
+            if time.monotonic() < health.probe_from:
+                return
+            spider.logger.info(f"[hosthealth] {health.host}: recovered")
+            self.crawler.stats.inc_value(f'hosthealth/{health.host}/recovered')
+            health.state = 'ok'
+            health.failed_probes = 0
+            health.blocks.clear()
+            self.set_delay(health, slot, min(health.base_delay * 4 or 1, self.max_delay))
+        elif health.delay is not None and health.base_delay is not None and health.delay > health.base_delay:
+            delay = health.delay * 0.9
+            # Snap back once the backoff is negligible instead of decaying forever
+            self.set_delay(health, slot, delay if delay - health.base_delay > 0.1 else health.base_delay)
+
+    def trip(self, health, slot, spider):
+        health.state = 'tripped'
+        health.tripped_until = time.monotonic() + self.trip_cooldown
+        self.crawler.stats.inc_value(f'hosthealth/{health.host}/tripped')
+        if health.host in self.critical_hosts:
+            spider.logger.error(f"[hosthealth] {health.host} keeps blocking us, closing spider")
+            self.crawler.engine.close_spider(spider, f'blocked_by_{health.host}')
+        else:
+            spider.logger.error(
+                f"[hosthealth] {health.host}: circuit open for {self.trip_cooldown:.0f}s, its requests are dropped"
+            )
+
+
+class CancelledRequestMiddleware:
+    """
+    Drops requests the spider has given up on before they are downloaded,
+    e.g. the enrichment branches of a movie whose deadline has passed:
+    spider.is_cancelled(request) is asked for every request. Dropped ones
+    fail with IgnoreRequest, so their errbacks still run.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_request(self, request, spider):
+        is_cancelled = getattr(spider, 'is_cancelled', None)
+        if is_cancelled is not None and is_cancelled(request):
+            self.crawler.stats.inc_value('cancelled_requests')
+            raise IgnoreRequest(f"Cancelled by the spider: {request.url}")
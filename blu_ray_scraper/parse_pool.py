@@ -0,0 +1,61 @@
+"""
+Optional process pool for the HTML extractors.
+
+Parsing a detail page is a few ms of CPU in the reactor thread; with enough
+pages in flight that, not the network, caps throughput. With
+PARSE_POOL_WORKERS > 0 the spider ships each response's raw bytes to a
+worker process, which rebuilds the response, runs a module-level extractor
+(extract_detail & co. in the spider module) and sends back plain data.
+The callback awaits the result, so the reactor keeps downloading meanwhile.
+
+At most PARSE_POOL_MAX_PENDING pages are queued for the workers; callbacks
+beyond that wait their turn, and Scrapy stops starting downloads while too
+many responses sit in its scraper queue (SCRAPER_SLOT_MAX_ACTIVE_SIZE), so
+a slow pool slows the crawl down instead of piling up responses in memory.
+
+With 0 workers (the default) the extractors just run inline.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from scrapy.http import HtmlResponse
+
+
+def run_extractor(extractor, url, body, encoding, *args):
+    # Worker side: rebuild the response from what was pickled over
+    response = HtmlResponse(url=url, body=body, encoding=encoding)
+    return extractor(response, *args)
+
+
+class ParsePool:
+
+    def __init__(self, workers=0, max_pending=None):
+        self.workers = workers
+        self.max_pending = max_pending or workers * 4
+        self._executor = None
+        self._pending = None
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.getint('PARSE_POOL_WORKERS', 0), settings.getint('PARSE_POOL_MAX_PENDING', 0))
+
+    def start(self):
+        if self.workers and self._executor is None:
+            # spawn, not fork: forking a process with a running reactor isn't safe
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            self._pending = asyncio.Semaphore(self.max_pending)
+
+    async def run(self, extractor, response, *args):
+        """extractor(response, *args), in a worker process when the pool is on."""
+        if not self.workers:
+            return extractor(response, *args)
+        self.start()
+        async with self._pending:
+            future = self._executor.submit(run_extractor, extractor, response.url, response.body, response.encoding, *args)
+            return await asyncio.wrap_future(future)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -20,10 +20,86 @@ from botocore.exceptions import ReadTimeoutError
 import time
 import logging
 
+from blu_ray_scraper.catalog import PRICE_FIELDS, Catalog
+from blu_ray_scraper.known_titles import title_id
+from blu_ray_scraper.price_history import PriceHistory
+
 class BluRayScraperPipeline:
     def process_item(self, item, spider):
         return item
-    
+
+
+class CatalogPipeline:
+    """
+    Upserts finished items into the country-normalised Catalog (see catalog.py)
+    and records the (country, format) listings they were seen in.
+    """
+
+    def open_spider(self, spider):
+        catalog = getattr(spider, 'catalog', None)
+        self.owns_catalog = catalog is None
+        self.catalog = catalog or Catalog(spider.settings.get('CATALOG_PATH', 'data/catalog.sqlite'))
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        key = self.catalog.upsert(adapter.asdict())
+        self.catalog.add_memberships(
+            (key, country, fmt) for fmt, country in adapter.get('listings') or []
+        )
+        return item
+
+    def close_spider(self, spider):
+        if self.owns_catalog:
+            self.catalog.close()
+        else:
+            self.catalog.commit()
+
+
+class PriceRefreshPipeline:
+    """
+    Writes refreshed price fields into the existing catalog records in place.
+    """
+
+    def open_spider(self, spider):
+        catalog = getattr(spider, 'catalog', None)
+        self.owns_catalog = catalog is None
+        self.catalog = catalog or Catalog(spider.settings.get('CATALOG_PATH', 'data/catalog.sqlite'))
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        key = title_id(adapter.get('blu_ray_url'))
+        prices = {field: adapter[field] for field in PRICE_FIELDS if adapter.get(field) not in (None, '')}
+        if key is None or not self.catalog.update_fields(key, prices):
+            raise DropItem(f"No catalog record for {adapter.get('blu_ray_url')}")
+        return item
+
+    def close_spider(self, spider):
+        if self.owns_catalog:
+            self.catalog.close()
+        else:
+            self.catalog.commit()
+
+
+class PriceHistoryPipeline:
+    """
+    Appends the camelcamelcamel prices of every item that has an ASIN to the
+    column-store price history (PRICE_HISTORY_DIR, see price_history.py).
+    """
+
+    def open_spider(self, spider):
+        self.history = PriceHistory(spider.settings.get('PRICE_HISTORY_DIR', 'data/price_history'))
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        asin = adapter.get('amazon_id')
+        if asin and 'amazon_current_price' in adapter:
+            self.history.append(asin, adapter)
+        return item
+
+    def close_spider(self, spider):
+        self.history.close()
+
+
 def sanitize_filename(title):
     sanitized_title = re.sub(r'[^\w\s]', '', title)
     sanitized_title = re.sub(r'\s+', ' ', sanitized_title).strip()
@@ -0,0 +1,195 @@
+"""
+Append-only price history, one fixed-width column file per field.
+
+Every camelcamelcamel lookup appends one row (ASIN, time, Amazon and
+3rd-party used prices) to data/price_history/. Columns are plain
+array() dumps, so millions of points load with one read per column and
+take 4 bytes per value; missing prices ('-', 'None', '') are stored as NaN.
+
+    python -m blu_ray_scraper.price_history latest B00005JLXH
+    python -m blu_ray_scraper.price_history range B00005JLXH --since 2025-01-01
+"""
+import argparse
+import math
+import os
+import re
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+# column -> array typecode; 'at' is epoch seconds, 'asin' an index into asins.txt
+COLUMNS = {
+    'at': 'I',
+    'asin': 'I',
+    'amazon_current_price': 'f',
+    'amazon_average_price': 'f',
+    'third_used_current_price': 'f',
+    'third_used_average_price': 'f',
+}
+PRICE_COLUMNS = [column for column, typecode in COLUMNS.items() if typecode == 'f']
+
+PRICE_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+
+def parse_price(value):
+    """'$1,234.56' / '12.99' -> float; '-', 'None', '' and the like -> NaN."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = PRICE_RE.search(str(value or ''))
+    return float(match.group().replace(',', '')) if match else math.nan
+
+
+class PriceHistory:
+
+    def __init__(self, directory='data/price_history', flush_every=100):
+        self.directory = directory
+        self.flush_every = flush_every
+        self.columns = {}
+        self.asins = []
+        self.asin_codes = {}
+        self.asins_size = 0
+        self.rows_by_asin = {}
+        self._files = None
+        self._pending = 0
+        self.load()
+
+    def column_path(self, column):
+        return os.path.join(self.directory, f'{column}.{COLUMNS[column]}32')
+
+    def load(self):
+        asins_path = os.path.join(self.directory, 'asins.txt')
+        if os.path.exists(asins_path):
+            with open(asins_path, 'rb') as f:
+                data = f.read()
+            # Complete lines only; a torn last one is cut off when the file is reopened
+            self.asins_size = data.rfind(b'\n') + 1
+            self.asins = data[:self.asins_size].decode('ascii').split()
+        self.asin_codes = {asin: code for code, asin in enumerate(self.asins)}
+
+        for column, typecode in COLUMNS.items():
+            values = array(typecode)
+            path = self.column_path(column)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    data = f.read()
+                values.frombytes(data[:len(data) - len(data) % values.itemsize])
+            self.columns[column] = values
+
+        # A crash between column writes leaves them uneven: keep complete rows only,
+        # and none from the first one whose ASIN never made it to asins.txt
+        rows = min(len(values) for values in self.columns.values())
+        for row, code in enumerate(self.columns['asin'][:rows]):
+            if code >= len(self.asins):
+                rows = row
+                break
+        for values in self.columns.values():
+            del values[rows:]
+
+        for row, code in enumerate(self.columns['asin']):
+            self.rows_by_asin.setdefault(code, array('I')).append(row)
+
+    def __len__(self):
+        return len(self.columns['at'])
+
+    def open(self):
+        if self._files is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._files = {}
+        for column, values in self.columns.items():
+            f = open(self.column_path(column), 'ab')
+            f.truncate(len(values) * values.itemsize)
+            self._files[column] = f
+        f = open(os.path.join(self.directory, 'asins.txt'), 'a', encoding='ascii')
+        f.truncate(self.asins_size)
+        self._files['asins'] = f
+
+    def append(self, asin, prices, at=None):
+        """Record one lookup; `prices` holds the scraped strings (or numbers) keyed by column name."""
+        self.open()
+        code = self.asin_codes.get(asin)
+        if code is None:
+            code = self.asin_codes[asin] = len(self.asins)
+            self.asins.append(asin)
+            # On disk before any row that refers to it
+            self._files['asins'].write(asin + '\n')
+            self._files['asins'].flush()
+
+        row = {'at': int(at if at is not None else time.time()), 'asin': code}
+        for column in PRICE_COLUMNS:
+            row[column] = parse_price(prices.get(column))
+
+        self.rows_by_asin.setdefault(code, array('I')).append(len(self))
+        for column, value in row.items():
+            values = self.columns[column]
+            values.append(value)
+            self._files[column].write(values[-1:].tobytes())
+
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self._files is None:
+            return
+        for f in self._files.values():
+            f.flush()
+        self._pending = 0
+
+    def close(self):
+        if self._files is None:
+            return
+        for f in self._files.values():
+            f.close()
+        self._files = None
+        self._pending = 0
+
+    def _point(self, row):
+        point = {'asin': self.asins[self.columns['asin'][row]], 'at': self.columns['at'][row]}
+        for column in PRICE_COLUMNS:
+            value = self.columns[column][row]
+            point[column] = None if math.isnan(value) else round(value, 2)
+        return point
+
+    def latest(self, asin):
+        rows = self.rows_by_asin.get(self.asin_codes.get(asin))
+        return self._point(rows[-1]) if rows else None
+
+    def range(self, asin, start=None, end=None):
+        """Points of `asin` with start <= at <= end (epoch seconds), oldest first."""
+        rows = self.rows_by_asin.get(self.asin_codes.get(asin))
+        if not rows:
+            return []
+        # Rows are appended in time order, so each ASIN's timestamps are sorted
+        times = [self.columns['at'][row] for row in rows]
+        lo = bisect_left(times, start) if start is not None else 0
+        hi = bisect_right(times, end) if end is not None else len(rows)
+        return [self._point(row) for row in rows[lo:hi]]
+
+
+def epoch(value):
+    """'2025-01-31' (UTC) -> epoch seconds."""
+    if value is None:
+        return None
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dir', default='data/price_history')
+    commands = parser.add_subparsers(dest='command', required=True)
+    latest = commands.add_parser('latest', help='most recent prices of an ASIN')
+    latest.add_argument('asin')
+    between = commands.add_parser('range', help='price points of an ASIN in a date range')
+    between.add_argument('asin')
+    between.add_argument('--since')
+    between.add_argument('--until')
+    args = parser.parse_args()
+
+    history = PriceHistory(args.dir)
+    if args.command == 'latest':
+        print(history.latest(args.asin))
+    else:
+        for point in history.range(args.asin, epoch(args.since), epoch(args.until)):
+            print(point)
@@ -51,21 +51,95 @@ COOKIES_ENABLED = True
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
+# Same as Scrapy's, but requests the spider gave up on while they sat in a
+# download slot's queue are dropped instead of sent (see download_handlers.py)
+DOWNLOAD_HANDLERS = {
+   "http": "blu_ray_scraper.download_handlers.CancellableHTTPDownloadHandler",
+   "https": "blu_ray_scraper.download_handlers.CancellableHTTPDownloadHandler",
+}
+
 DOWNLOADER_MIDDLEWARES = {
-   "blu_ray_scraper.middlewares.StopOn403Middleware": 543,
+   # First, so requests the spider has given up on never reach the throttles
+   "blu_ray_scraper.middlewares.CancelledRequestMiddleware": 50,
+   "blu_ray_scraper.middlewares.HostHealthMiddleware": 560,
+   # Only with CLOUDSCRAPER_ENABLED
+   "blu_ray_scraper.cloudscraper_middleware.ThreadedCloudScraperMiddleware": 600,
+}
+
+# Fetch pages through cloudscraper (pip install cloudscraper) instead of
+# Scrapy's downloader, on a worker pool (one cloudscraper session per thread)
+CLOUDSCRAPER_ENABLED = False
+CLOUDSCRAPER_POOL_SIZE = 16
+CLOUDSCRAPER_PER_HOST = 8
+CLOUDSCRAPER_TIMEOUT = 60
+
+# Amazon buy-link resolution: the blu-ray.com click.php hop is throttled
+# with the rest of blu-ray.com, the off-site hops after it run in their own
+# download slot so a slow redirect can only hold up other redirects
+AMAZON_REDIRECT_TIMEOUT = 30
+DOWNLOAD_SLOTS = {
+    "amazon-redirect": {"concurrency": 8, "delay": 0},
 }
 
+# One record per title plus title x country x format membership (see catalog.py)
+CATALOG_PATH = 'data/catalog.sqlite'
+
+# Column files of the camelcamelcamel price history (see price_history.py)
+PRICE_HISTORY_DIR = 'data/price_history'
+
+# Seconds a movie may wait for its screenshots / cast / price branches
+# before whatever has arrived is emitted as the item
+ENRICHMENT_TIMEOUT = 180
+
+# Movies between their detail request and their finished item; titles
+# released beyond this wait as frontier entries instead of queued requests
+MAX_MOVIES_IN_FLIGHT = 50
+
+# Resumable crawls: the frontier is written here every CHECKPOINT_INTERVAL seconds
+CHECKPOINT_DIR = 'data/checkpoints'
+CHECKPOINT_INTERVAL = 60
+
+# Worker processes for the HTML extractors (see parse_pool.py); 0 parses in the reactor
+PARSE_POOL_WORKERS = 0
+# Pages queued for the workers at most (default: 4 per worker)
+PARSE_POOL_MAX_PENDING = 0
+
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
 #EXTENSIONS = {
 #    "scrapy.extensions.telnet.TelnetConsole": None,
 #}
+EXTENSIONS = {
+    "blu_ray_scraper.extensions.AdaptiveConcurrency": 500,
+}
+
+# Per-domain AIMD concurrency/delay (see extensions.py); domains not listed
+# start at ADAPTIVE_START_CONCURRENCY / ADAPTIVE_START_DELAY
+ADAPTIVE_ENABLED = True
+ADAPTIVE_START_CONCURRENCY = 2
+ADAPTIVE_START_DELAY = 1.0
+ADAPTIVE_MAX_CONCURRENCY = 16
+ADAPTIVE_MAX_DELAY = 10
+ADAPTIVE_LATENCY_FACTOR = 3.0
+ADAPTIVE_DELAY_STEP = 0.1
+ADAPTIVE_DOMAINS = {
+    # HTML site: stay well under the ban threshold
+    "www.blu-ray.com": {"concurrency": 1, "delay": 1.0, "max_concurrency": 4, "min_delay": 0.25},
+    # Image CDN can run wide open
+    "images.static-bluray.com": {"concurrency": 16, "delay": 0, "max_concurrency": 64},
+    # Zyte-proxied price lookups
+    "camelcamelcamel.com": {"concurrency": 4, "delay": 0, "max_concurrency": 16},
+    "www.ebay.com": {"concurrency": 4, "delay": 0, "max_concurrency": 16},
+    "amazon-redirect": {"concurrency": 8, "delay": 0, "max_concurrency": 16},
+}
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
     'blu_ray_scraper.pipelines.ScreenshotImagesPipeline': 200,
     'blu_ray_scraper.pipelines.PictureImagesPipeline': 201,
+    'blu_ray_scraper.pipelines.CatalogPipeline': 300,
+    'blu_ray_scraper.pipelines.PriceHistoryPipeline': 305,
     # 'blu_ray_scraper.pipelines.BluRayPipeline': 300,
 }
 
@@ -109,5 +183,33 @@ IMAGES_STORE = 's3://salient-blu-ray-scrapping/'
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 
+# Proxy for the camelcamelcamel and eBay lookups; empty for none
+PRICE_PROXY = f"http://{os.getenv('ZYTE_KEY')}:@api.zyte.com:8011"
+
+# Upstream sites. benchmarks/mock_upstream.py prints the -s flags that
+# point these at it, for load tests that don't touch the real sites
+BLURAY_BASE_URL = 'https://www.blu-ray.com'
+BLURAY_IMAGES_BASE_URL = 'https://images.static-bluray.com'
+CAMELCAMELCAMEL_BASE_URL = 'https://camelcamelcamel.com'
+EBAY_BASE_URL = 'https://www.ebay.com'
+
+# eBay search results per UPC are kept in the catalog and matched against each
+# title; later lookups skip eBay for UPCs searched within EPID_CACHE_TTL seconds
+# (searches without product listings: EPID_CACHE_MISS_TTL)
+EPID_CACHE_TTL = 30 * 24 * 3600
+EPID_CACHE_MISS_TTL = 7 * 24 * 3600
+
 RETRY_ENABLED = True  # keep retry enabled globally
-RETRY_HTTP_CODES = [500, 502, 503, 504, 522, 524, 403]
\ No newline at end of file
+# No 403/429: HostHealthMiddleware retries those itself, after the host's backoff
+RETRY_HTTP_CODES = [500, 502, 503, 504, 522, 524]
+
+# Per-host backoff and circuit breaking for 403/429 (see HostHealthMiddleware)
+HOSTHEALTH_WINDOW = 60
+HOSTHEALTH_BURST = 3
+HOSTHEALTH_PAUSE = 30
+HOSTHEALTH_MAX_PAUSE = 600
+HOSTHEALTH_TRIP_AFTER = 5
+HOSTHEALTH_TRIP_COOLDOWN = 1800
+HOSTHEALTH_MAX_RETRIES = 5
+# Closing (and resuming later) beats running on without these
+HOSTHEALTH_CRITICAL_HOSTS = ['www.blu-ray.com']
\ No newline at end of file
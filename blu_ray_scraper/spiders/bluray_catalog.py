@@ -0,0 +1,906 @@
+import os
+import re
+import math
+import time
+import hashlib
+import scrapy
+from collections import defaultdict, deque
+from urllib.parse import urlparse, parse_qs
+from scrapy.exceptions import CloseSpider
+from dotenv import load_dotenv
+
+load_dotenv()  # Load environment variables from .env file
+from blu_ray_scraper.catalog import Catalog, import_all
+from blu_ray_scraper.countries import COUNTRIES
+from blu_ray_scraper.detail_parser import parse_detail_page
+from blu_ray_scraper.enrichment import MovieJoin, SingleFlight
+from blu_ray_scraper.frontier import FrontierCheckpoint, TitleFrontier
+from blu_ray_scraper.known_titles import title_id
+from blu_ray_scraper.parse_pool import ParsePool
+from blu_ray_scraper.title_match import TitleMatcher
+
+# Upstream sites; the BLURAY_BASE_URL & co. settings can point them elsewhere
+# (e.g. at benchmarks/mock_upstream.py)
+BLURAY_BASE_URL = 'https://www.blu-ray.com'
+IMAGES_BASE_URL = 'https://images.static-bluray.com'
+CAMELCAMELCAMEL_BASE_URL = 'https://camelcamelcamel.com'
+EBAY_BASE_URL = 'https://www.ebay.com'
+
+# Everything that differs between the Blu-ray, 4K, 3D and DVD crawls
+FORMATS = {
+    'br': {'series': 'Blu-Ray', 'section': 'movies', 'query': '', 'covers': 'covers', 'store': 'br'},
+    '4k': {'series': '4K', 'section': 'movies', 'query': '&ultrahd=1', 'covers': 'covers', 'store': '4k'},
+    '3d': {'series': '3D', 'section': 'movies', 'query': '&other_bluray3d=1', 'covers': 'covers', 'store': '3D'},
+    'dvd': {'series': 'DVD', 'section': 'dvd', 'query': '', 'covers': 'dvdcovers', 'store': 'DVD'},
+}
+
+
+def parse_years(years):
+    """'2006-2024,1969' -> [2006, ..., 2024, 1969]"""
+    result = []
+    for part in str(years).split(','):
+        part = part.strip()
+        if '-' in part:
+            start, end = part.split('-', 1)
+            result.extend(range(int(start), int(end) + 1))
+        elif part:
+            result.append(int(part))
+    return result
+
+def is_true(value):
+    """Spider -a flags: anything but '', 0 or false switches them on."""
+    return value not in (None, '', '0', 'false', 'False')
+
+# Deeper hops first: a movie that has started is finished before new ones
+# are let in, and listing pages only run when nothing else is waiting
+PRIORITY_LISTING = 0
+LISTING_PAGE_SIZE = 20
+PRIORITY_DETAIL = 10
+PRIORITY_ENRICHMENT = 20
+
+AMAZON_REDIRECT_CODES = [301, 302, 303, 307, 308]
+AMAZON_REDIRECT_SLOT = 'amazon-redirect'
+AMAZON_MAX_HOPS = 5
+AMAZON_ASIN_RE = re.compile(r'amazon\.[^/]+/(?:.*/)?(?:dp|gp/product|o/ASIN)/([A-Z0-9]{10})')
+
+
+def amazon_id_from_url(url):
+    match = AMAZON_ASIN_RE.search(url)
+    if match:
+        return match.group(1)
+    return url.split("?")[0].split("/")[-1]
+
+
+IMAGE_KINDS = ('front', 'overview', 'back', 'slip', 'slipback')
+
+
+def image_url_pattern(covers='covers', images_url=IMAGES_BASE_URL):
+    # One alternation for every cover kind, so the script text is scanned once
+    kinds = '|'.join(IMAGE_KINDS)
+    return re.compile(rf"{re.escape(images_url)}/movies/{covers}/\d+_(?P<kind>{kinds})\.jpg\?t=\d+")
+
+
+def extract_image_urls(script_text, pattern):
+    # script_text: all <script> tags' inner text in one string (parse_detail_page's links['scripts'])
+    # pattern: image_url_pattern() for the format's covers directory
+    image_urls = {f'{kind}_url': None for kind in IMAGE_KINDS}
+
+    # First URL of each kind, stopping as soon as all of them are found
+    missing = len(image_urls)
+    for match in pattern.finditer(script_text):
+        key = f"{match.group('kind')}_url"
+        if image_urls[key] is None:
+            image_urls[key] = match.group(0)
+            missing -= 1
+            if not missing:
+                break
+
+    # Store URLs in movie_details
+    return image_urls
+
+
+def extract_screenshot_urls(response, screenshot_page, base_url=BLURAY_BASE_URL):
+    # Works on any downloaded page: the dedicated screenshots tab, or the
+    # detail page itself when the movie has no screenshots tab.
+    screenshot_urls = []
+    if screenshot_page:
+        img_urls = list({
+            img.attrib["src"]
+            for img in response.xpath('//img[contains(@src, "/reviews/")]')
+            if "_tn" not in img.attrib["src"]
+        })
+
+        script_urls = list(set(re.findall(r'src\s*[:=]\s*[\'"]([^\'"]*/reviews/[^\'"]+)[\'"]', response.text)))
+        img_urls = list(set(img_urls + script_urls))
+
+
+        for url in img_urls:
+            if url:
+                if '_tn' in url:
+                    # Replace _tn with _1080p
+                    url = url.replace('_tn', '_1080p')
+                    screenshot_urls.append(url)  # In case there is no extension
+                elif '_large' in url:
+                    # Replace _large with _1080p
+                    url = url.replace('_large', '_1080p')
+                    screenshot_urls.append(url)  # In case there is no extension
+                else:
+                    # Split the URL before the extension
+                    parts = url.rsplit('.', 1)
+                    if len(parts) == 2:
+                        # Append _1080p before the extension
+                        new_url = f'{parts[0]}_1080p.{parts[1]}'
+                        screenshot_urls.append(new_url)
+                    else:
+                        screenshot_urls.append(url)  # In case there is no extension
+    else:
+        img_urls = list({
+            img.attrib["src"]
+            for img in response.xpath('//img[contains(@src, "/reviews/")]')
+        })
+        script_urls = list(set(re.findall(r'src\s*[:=]\s*[\'"]([^\'"]*/reviews/[^\'"]+)[\'"]', response.text)))
+        img_urls = set(img_urls + script_urls)
+        for url in img_urls:
+            if url:
+                url = url.replace('_tn', '_1080p')
+                screenshot_urls.append(url)
+
+    for i, url in enumerate(screenshot_urls):
+        if '/images/reviews/' in url:
+            url = url.replace('.jpg', '_1080p.jpg') if '_1080p' not in url else url
+            screenshot_urls[i] = f'{base_url}{url}'
+
+    screenshot_urls = [url for url in screenshot_urls if '1158_2' not in url and '1158_3' not in url]
+    screenshot_urls = list(set(screenshot_urls))
+
+    return screenshot_urls
+
+
+# The extractors below take a response and return plain data, so the
+# spider can run them inline or in a ParsePool worker process.
+
+def extract_detail(response, image_pattern, base_url=BLURAY_BASE_URL):
+    details, links = parse_detail_page(response.text, home_url=f'{base_url}/')
+    details.update(extract_image_urls(links.pop('scripts'), image_pattern))
+    if not links['screenshots']:
+        # No screenshots tab: whatever screenshots exist are on this page.
+        details['screenshot_urls'] = extract_screenshot_urls(response, False, base_url)
+    return details, links
+
+
+def extract_cast_and_crew(response):
+    cast_crew_data = defaultdict(list)
+    # Loop through all tables under the container
+    for table in response.css('table.bevel'):
+
+        # Get the role (Director, Writer, etc.)
+        role = table.css("td:nth-child(2) h5::text").get()
+        if not role:
+            continue
+
+        # Get all names in the table
+        for row in table.css("tr"):
+            name = row.css("td.middle a::text").get()
+            if name:
+                cast_crew_data[role].append(name)
+    return dict(cast_crew_data)
+
+
+def extract_camelcamelcamel(response):
+    """
+    (product_details, table_found): product identifiers and price details
+    from a CamelCamelCamel product page.
+    """
+    product_details = {}
+
+    # table with product identifiers
+    tables = response.xpath("//table[@class='product_fields']")
+
+    if tables:
+        rows = tables[0].xpath(".//tr")
+        for row in rows:
+            key = row.xpath("./td[1]//text()").getall()
+            key = ''.join(key).replace('\u200b', '').strip()
+
+            value_parts = row.xpath("./td[2]//text()").getall()
+            value = ''.join(value_parts).replace('\u200b', '').strip()
+            key_mappings = {
+                'manufacturer': 'Manufacturer',
+                'isbn': 'ISBN',
+                'ean': 'EAN',
+                'upc': 'UPC',
+                'sku': 'SKU',
+                'asin': 'ASIN'
+            }
+            for key_pattern, standard_key in key_mappings.items():
+                if standard_key in key:
+                    if value:
+                        product_details[key_pattern] = value
+                    break
+
+    # price table
+    rows = response.xpath("//div[@class='table-scroll camelegend']//table//tr")
+
+    for row in rows:
+        label = row.xpath(".//td[1]/text()").getall()
+        if not label:
+            continue
+        label = [t.strip() for t in label if t.strip()]
+        if not label:
+            continue
+        label = label[0].lower()
+
+        # Extract current and average prices from the appropriate columns
+        current_price = row.xpath("./td[4]/text()[1]").get(default="").strip()
+        average_price = row.xpath("./td[5]/text()[1]").get(default="").strip()
+
+        if "amazon" in label:
+            product_details["amazon_current_price"] = current_price.replace('$','') if current_price != "-" else '-'
+            product_details["amazon_average_price"] = average_price.replace('$','') if average_price != "-" else '-'
+        elif "3rd party used" in label:
+            product_details["third_used_current_price"] = current_price.replace('$','') if current_price != "-" else '-'
+            product_details["third_used_average_price"] = average_price.replace('$','') if average_price != "-" else 'None'
+
+    return product_details, bool(tables)
+
+
+class BluRayCatalogSpider(scrapy.Spider):
+    """
+    One spider for every blu-ray.com format and country.
+
+        scrapy crawl bluray_catalog -a country=us -a formats=br,4k,3d -a years=2006-2024
+        scrapy crawl bluray_catalog -a countries=us,uk,de -a formats=br
+        scrapy crawl bluray_catalog -a countries=all
+
+    Every (format, country) search listing is walked in the same process
+    and they all share one dedupe frontier. Only the listings depend on the
+    country cookie; detail pages and the enrichment hops always use 'us'.
+    So a title that shows up in several listings (every 4K and 3D title is
+    also in the plain Blu-ray search, most titles are listed in many
+    countries) is fetched and enriched once.
+
+    Results go to the Catalog (CATALOG_PATH): one record per title, plus a
+    membership row for every (country, format) listing the title was seen
+    in. Titles that already have a record only get their membership rows.
+
+    The frontier is checkpointed to CHECKPOINT_DIR every CHECKPOINT_INTERVAL
+    seconds and when the spider closes, so a run stopped by a 403, a blank
+    page or a crash picks up where it left off: only the listing pages,
+    detail pages and enrichment branches that never finished are fetched
+    again. Pass -a fresh=1 to throw the checkpoint away.
+
+    Requests are scheduled depth first (enrichment > detail > listing) and at
+    most MAX_MOVIES_IN_FLIGHT movies are between their detail request and
+    their item at any time; released titles beyond that wait in self.held
+    as plain frontier entries until a movie finishes.
+
+    -a incremental=1 turns a full sweep into a delta crawl for daily
+    refreshes: only page 0 of each year is fetched up front, a year whose
+    result count hasn't changed since the last fully fetched run stops
+    there, and the others are walked in full (the search results have no
+    guaranteed order, so new titles can be on any page). Titles already in
+    the catalog only get their membership rows either way.
+    """
+    name = "bluray_catalog"
+    series = 'Blu-Ray'
+    default_formats = ('br', '4k', '3d')
+    default_years = '2006-2024,1969'
+
+    custom_settings = {
+        'USER_AGENT': 'Mozilla/5.0',
+        # No global DOWNLOAD_DELAY: AdaptiveConcurrency tunes each domain's slot
+        # Add proxy or middleware settings here if needed
+    }
+
+    def __init__(self, country=None, formats=None, years=None, countries=None, fresh=None, incremental=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        
+        os.makedirs("data", exist_ok=True)
+        self.formats = formats.split(',') if formats else list(self.default_formats)
+        unknown = [fmt for fmt in self.formats if fmt not in FORMATS]
+        if unknown:
+            raise ValueError(f"Unknown formats {unknown}, expected some of {list(FORMATS)}")
+
+        countries = countries or country
+        if not countries:
+            raise ValueError("Pass -a country=<code> or -a countries=<code,code,...|all>")
+        self.countries = list(COUNTRIES) if countries == 'all' else countries.split(',')
+        self.country = self.countries[0]
+
+        self.years = parse_years(years or self.default_years)
+        self.logger.info(f"Crawling {self.formats} for countries {self.countries}")
+
+        self.listings = [(fmt, country) for fmt in self.formats for country in self.countries]
+        self.frontier = TitleFrontier()
+        self.fresh = is_true(fresh)
+        self.incremental = is_true(incremental)
+        self.held = deque()
+        self.expected_pages = {}
+        # Result counts seen on page 0, saved once the whole listing is fetched
+        self.listing_counts = {}
+        self.movies_in_flight = 0
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        catalog_path = crawler.settings.get('CATALOG_PATH', 'data/catalog.sqlite')
+        spider.catalog = Catalog(catalog_path)
+        if not spider.catalog.ids:
+            # First run on this catalog: bring in the data/<fmt>-<country>.json(l) files of the old spiders
+            import_all(spider.catalog, os.path.dirname(catalog_path) or '.', log=spider.logger.info)
+
+        spider.base_url = crawler.settings.get('BLURAY_BASE_URL', BLURAY_BASE_URL).rstrip('/')
+        spider.camelcamelcamel_url = crawler.settings.get('CAMELCAMELCAMEL_BASE_URL', CAMELCAMELCAMEL_BASE_URL).rstrip('/')
+        spider.ebay_url = crawler.settings.get('EBAY_BASE_URL', EBAY_BASE_URL).rstrip('/')
+        spider.price_proxy = crawler.settings.get('PRICE_PROXY')
+        spider.ebay_lookups = SingleFlight()
+        spider.epid_ttl = crawler.settings.getfloat('EPID_CACHE_TTL', 30 * 24 * 3600)
+        spider.epid_miss_ttl = crawler.settings.getfloat('EPID_CACHE_MISS_TTL', 7 * 24 * 3600)
+        images_url = crawler.settings.get('BLURAY_IMAGES_BASE_URL', IMAGES_BASE_URL).rstrip('/')
+        spider.image_patterns = {fmt: image_url_pattern(FORMATS[fmt]['covers'], images_url) for fmt in spider.formats}
+
+        # One checkpoint per set of listings, so different crawls don't resume each other
+        digest = hashlib.sha1(repr(sorted(spider.listings)).encode()).hexdigest()[:12]
+        checkpoint_dir = crawler.settings.get('CHECKPOINT_DIR', 'data/checkpoints')
+        spider.checkpoint = FrontierCheckpoint(os.path.join(checkpoint_dir, f'{spider.name}-{digest}.json'))
+        spider.checkpoint_interval = crawler.settings.getfloat('CHECKPOINT_INTERVAL', 60)
+        spider.last_checkpoint = time.monotonic()
+        spider.max_movies_in_flight = crawler.settings.getint('MAX_MOVIES_IN_FLIGHT', 50)
+        spider.parse_pool = ParsePool.from_settings(crawler.settings)
+        if spider.fresh:
+            spider.checkpoint.clear()
+        spider.resumed = spider.checkpoint.load(spider.frontier)
+        if spider.resumed or spider.frontier.pages_done:
+            spider.logger.info(f"Resuming from {spider.checkpoint.path}: {len(spider.resumed)} titles in flight")
+        return spider
+
+    def closed(self, reason):
+        self.catalog.commit()
+        unfinished = len(self.held) + self.movies_in_flight
+        if reason == 'finished' and not unfinished:
+            self.checkpoint.clear()
+        else:
+            if unfinished:
+                self.logger.warning(f"{unfinished} titles never finished, keeping the checkpoint for a resumed run")
+            self.checkpoint.compact(self.frontier, done=self.catalog)
+            self.logger.info(f"Checkpoint saved to {self.checkpoint.path} ({reason})")
+        self.catalog.close()
+        self.parse_pool.close()
+
+    def maybe_checkpoint(self):
+        if time.monotonic() - self.last_checkpoint < self.checkpoint_interval:
+            return
+        # Commit first: the checkpoint must never be ahead of the catalog
+        self.catalog.commit()
+        self.checkpoint.save(self.frontier, done=self.catalog)
+        self.last_checkpoint = time.monotonic()
+
+    def listing_url(self, fmt, year, page):
+        config = FORMATS[fmt]
+        return f"{self.base_url}/{config['section']}/search.php?releaseyear={year}{config['query']}&submit=Search&action=search&page={page}"
+
+    def listing_request(self, listing, year, page):
+        fmt, country = listing
+        return scrapy.Request(
+            url=self.listing_url(fmt, year, page),
+            callback=self.parse_movie_list,
+            errback=self.listing_failed,
+            # Separate cookie jar per country so concurrent listings can't
+            # overwrite each other's country cookie
+            meta={'page': page, 'year': year, 'listing': listing, 'cookiejar': country},
+            # Page 0 first: it carries the live count the other pages are reconciled against
+            priority=PRIORITY_LISTING + (page == 0),
+            cookies={
+                "country": country,
+                "listlayout_7": "simple",
+                "listlayout_21": "simple",
+            },
+            # Same URL, different country cookie
+            dont_filter=True
+        )
+
+    def start_requests(self):
+        # Detail pages that were in flight when the last run stopped
+        self.held.extend((key, self.frontier.titles[key]) for key in self.resumed)
+        yield from self.drain_held()
+        for year in self.years:
+            for listing in self.listings:
+                for page in self.planned_pages(year, listing):
+                    yield self.listing_request(listing, year, page)
+            yield from self.release_titles(year)
+
+    def planned_pages(self, year, listing):
+        """
+        Listing pages to issue up front: the missing ones when the page count
+        is known (resumed crawl), otherwise every page the result count seen
+        on the last run predicts, so a year doesn't wait for page 0 first.
+        """
+        if (year, listing) in self.frontier.page_counts:
+            return self.frontier.missing_pages(year, listing)
+        if self.incremental:
+            return [0]
+        fmt, country = listing
+        count = self.catalog.listing_count(fmt, country, year)
+        expected = max(math.ceil(count / LISTING_PAGE_SIZE), 1) if count is not None else 1
+        self.expected_pages[(year, listing)] = expected
+        done = self.frontier.pages_done[(year, listing)]
+        return [page for page in range(expected) if page not in done]
+
+    def parse_movie_list(self, response):
+        page = response.meta["page"]
+        year = response.meta["year"]
+        listing = response.meta["listing"]
+        fmt, country = listing
+
+        if not response.xpath(f'//a[@href="{self.base_url}/"]'):
+            raise CloseSpider(reason="IP blocked or blank page")
+
+        total = self.frontier.page_counts.get((year, listing))
+        if page and total is not None and page >= total:
+            # Issued from a stale cached count and already in flight when page 0 shrank it
+            self.logger.info(f"[{fmt}/{country}] Page {page} is past the {total} pages of {year}, ignoring")
+            return
+
+        section = FORMATS[fmt]['section']
+        movie_links = response.xpath(f'//table[@class="bevel"]//a[contains(@href, "/{section}/")]/@href').getall()
+
+        new_links = 0
+        memberships = []
+        for link in movie_links:
+            absolute_url = response.urljoin(link)
+            key = title_id(absolute_url)
+            if (key or absolute_url) not in self.frontier.titles:
+                new_links += 1
+            self.frontier.add(key or absolute_url, absolute_url, year, listing)
+            if key is not None:
+                memberships.append((key, country, fmt))
+        self.catalog.add_memberships(memberships)
+
+        self.logger.info(f"[{fmt}/{country}] Page {page}: Found {len(movie_links)} total links, {new_links} unique new links")
+
+        # Only calculate pagination on first page
+        if page == 0:
+            total_text = response.css(".oswaldcollection::text").get() or ''
+            match = re.search(r'\d+', total_text)
+            total_pages = 1
+            movies_number = 0
+            if match:
+                movies_number = int(match.group())
+                total_pages = math.ceil(movies_number / LISTING_PAGE_SIZE)
+                self.logger.info(f"[{fmt}/{country}] {movies_number} movies to scrape for year {year} across {total_pages} pages.")
+            previous_count = self.catalog.listing_count(fmt, country, year)
+            self.listing_counts[(year, listing)] = movies_number
+
+            if self.incremental and movies_number == previous_count:
+                self.logger.info(f"[{fmt}/{country}] {year} unchanged ({movies_number} movies), skipping the rest")
+                total_pages = 1
+
+            # Reconcile with the pages already issued from the cached count:
+            # add the ones it missed, the extra ones are ignored on arrival
+            expected = self.expected_pages.pop((year, listing), 1)
+            for page_no in range(expected, total_pages):
+                yield self.listing_request(listing, year, page_no)
+            if expected > max(total_pages, 1):
+                self.logger.info(f"[{fmt}/{country}] {year} shrank from {expected} to {total_pages} pages, cancelling the rest")
+            self.frontier.set_page_count(year, listing, total_pages)
+        
+        # Alternative: Check if this page has results, if not, stop pagination
+        elif len(movie_links) == 0:
+            self.logger.info(f"No more results found on page {page}, stopping pagination")
+
+        self.page_done(year, listing, page)
+        yield from self.release_titles(year)
+        self.maybe_checkpoint()
+
+    def page_done(self, year, listing, page, failed=False):
+        self.frontier.page_done(year, listing, page, failed=failed)
+        count = self.listing_counts.get((year, listing))
+        if count is None or not self.frontier.listing_complete(year, listing):
+            return
+        # Saved only once every page came in: an incremental run skips a
+        # listing whose count is unchanged, so saving it any earlier would
+        # lose the titles on pages that never made it
+        del self.listing_counts[(year, listing)]
+        if not self.frontier.listing_failed(year, listing):
+            fmt, country = listing
+            self.catalog.set_listing_count(fmt, country, year, count)
+
+    def listing_failed(self, failure):
+        meta = failure.request.meta
+        if self.is_cancelled(failure.request):
+            return
+        self.logger.warning(f"Listing page failed: {failure.request.url}: {failure.value!r}")
+        if meta['page'] == 0:
+            # Trust the cached count for this run; page 0 is retried on resume
+            self.frontier.set_page_count(meta['year'], meta['listing'], self.expected_pages.pop((meta['year'], meta['listing']), 1))
+        self.page_done(meta['year'], meta['listing'], meta['page'], failed=True)
+        yield from self.release_titles(meta['year'])
+
+    def release_titles(self, year):
+        self.held.extend(self.frontier.release(year))
+        yield from self.drain_held()
+
+    def drain_held(self):
+        while self.held and self.movies_in_flight < self.max_movies_in_flight:
+            key, title = self.held.popleft()
+            if key in self.catalog:
+                continue
+            self.movies_in_flight += 1
+            yield self.detail_request(key, title)
+
+    def movie_done(self):
+        self.movies_in_flight -= 1
+        yield from self.drain_held()
+
+    def detail_request(self, key, title):
+        listings = sorted(title['listings'])
+        return scrapy.Request(
+            url=title['url'],
+            callback=self.parse_movie_detail,
+            errback=self.detail_failed,
+            priority=PRIORITY_DETAIL,
+            meta={'key': key, 'movie_url': title['url'], 'year': title['year'], 'listings': listings},
+            cookies={
+                "country": 'us',
+                "listlayout_7": "simple",
+                "listlayout_21": "simple",
+            }
+        )
+
+    def detail_failed(self, failure):
+        self.logger.warning(f"Detail page failed: {failure.request.url}: {failure.value!r}")
+        yield from self.movie_done()
+
+    async def parse_movie_detail(self, response):
+        year = response.meta['year']
+        listings = response.meta['listings']
+        title = self.frontier.titles.get(response.meta.get('key'))
+        if title is not None:
+            # Listings parsed while the request was queued
+            listings = sorted(title['listings'])
+        membership = {
+            'formats': sorted({fmt for fmt, _ in listings}),
+            'countries': sorted({country for _, country in listings}),
+            'listings': [list(listing) for listing in listings],
+        }
+        if response.status == 404:
+            yield {
+                "blu_ray_url": response.url,
+                **membership,
+            }
+            for request in self.movie_done():
+                yield request
+            return
+        try:
+            details, links = await self.parse_pool.run(
+                extract_detail, response, self.image_patterns[membership['formats'][0]], self.base_url
+            )
+            if not links['home']:
+                raise CloseSpider(reason="IP blocked or blank page")
+        except Exception:
+            # The movie never gets to its branches, so free its slot here
+            for request in self.movie_done():
+                yield request
+            raise
+
+        movie_href = response.url
+
+        blu_ray_id = movie_href.split('/')[-2]
+        movie_details = {
+            'releaseYear': year,
+            'blu_ray_url': movie_href,
+            **membership,
+            'missing_links': False,
+            **details,
+        }
+        cast_crew_page_url = links['cast_crew']
+        amzn_link = links['amazon']
+
+        # Enrichment: the screenshots page, the cast & crew page and the
+        # price lookup don't depend on each other, so issue them together
+        # and let MovieJoin merge whatever comes back into one item.
+        screenshots_section = links['screenshots']
+        branches = []
+        if screenshots_section:
+            branches.append('screenshots')
+        if cast_crew_page_url:
+            branches.append('cast')
+        if amzn_link or movie_details.get('upc'):
+            branches.append('price')
+
+        # Branches a previous run already finished for this title
+        key = response.meta.get('key')
+        for branch, data in self.checkpoint.hops_for(key).items():
+            if branch in branches:
+                branches.remove(branch)
+                movie_details.update(data)
+        join = MovieJoin(movie_details, branches, timeout=self.settings.getfloat('ENRICHMENT_TIMEOUT', 180), key=key)
+        join.start(self.join_expired)
+
+        if 'screenshots' in branches:
+            screenshots_url = response.urljoin(screenshots_section)
+            yield self.enrichment_request(join, 'screenshots', screenshots_url, self.parse_screenshots, {"screenshot_page": True})
+
+        if 'cast' in branches:
+            # DVD titles have their cast page under /dvd/ as well
+            section = FORMATS[membership['formats'][0]]['section']
+            yield self.enrichment_request(
+                join, 'cast',
+                f'{self.base_url}/{section}/movies.php?id={blu_ray_id}&action=showcastandcrew&page=',
+                self.parse_cast_and_crew,
+            )
+
+        if 'price' in branches:
+            if amzn_link:
+                yield self.amazon_redirect_request(amzn_link, {'join': join, 'price_details': {}, 'amazon_link': amzn_link})
+            else:
+                for request in self.ebay_or_finish(join, {}):
+                    yield request
+
+        if not branches:
+            yield movie_details
+            for request in self.movie_done():
+                yield request
+
+    def enrichment_request(self, join, branch, url, callback, meta=None):
+        return scrapy.Request(
+            url=url,
+            callback=callback,
+            errback=self.enrichment_failed,
+            priority=PRIORITY_ENRICHMENT,
+            meta={'join': join, 'join_branch': branch, 'download_timeout': join.remaining(), **(meta or {})},
+            dont_filter=True,
+            cookies={
+                "country": 'us',
+                "listlayout_7": "simple",
+                "listlayout_21": "simple",
+            }
+        )
+
+    def enrichment_failed(self, failure):
+        request = failure.request
+        branch = request.meta['join_branch']
+        self.logger.warning(f"Enrichment branch '{branch}' failed for {request.url}: {failure.value!r}")
+        # Not checkpointed: a resumed run tries the branch again
+        yield from self.finish_branch(request.meta['join'], branch, request.meta.get('price_details'), record=False)
+
+    def join_expired(self, join):
+        self.logger.warning(f"Enrichment of {join.movie_details.get('blu_ray_url')} timed out, giving up on {sorted(join.pending)}")
+        self.crawler.stats.inc_value('enrichment/timed_out')
+        # Items only come out of callbacks: hand the partial one to a request that downloads nothing
+        self.crawler.engine.crawl(scrapy.Request(
+            'data:,',
+            callback=self.emit_expired,
+            cb_kwargs={'join': join},
+            priority=PRIORITY_ENRICHMENT,
+            dont_filter=True,
+        ))
+
+    def emit_expired(self, response, join):
+        yield join.movie_details
+        yield from self.movie_done()
+
+    def is_cancelled(self, request):
+        """True for requests not worth downloading any more (see CancelledRequestMiddleware)."""
+        join = request.meta.get('join')
+        if join is not None:
+            return join.timed_out
+        if request.callback == self.parse_movie_list:
+            # Issued from a stale cached count that page 0 has since shrunk
+            total = self.frontier.page_counts.get((request.meta['year'], request.meta['listing']))
+            return total is not None and request.meta['page'] >= total
+        return False
+
+    def finish_branch(self, join, branch, data=None, record=True):
+        if record and join.key is not None:
+            self.checkpoint.hop_done(join.key, branch, data)
+        item = join.complete(branch, data)
+        if item is not None:
+            yield item
+            yield from self.movie_done()
+        self.maybe_checkpoint()
+
+    async def parse_screenshots(self, response):
+        join = response.meta['join']
+        
+        try:
+            if not response.xpath(f'//a[@href="{self.base_url}/"]'):
+                raise CloseSpider(reason="IP blocked or blank page")
+
+            screenshot_urls = await self.parse_pool.run(
+                extract_screenshot_urls, response, response.meta["screenshot_page"], self.base_url
+            )
+        except Exception:
+            # Whatever went wrong, the movie mustn't wait on this branch forever
+            for result in self.finish_branch(join, 'screenshots', record=False):
+                yield result
+            raise
+        for result in self.finish_branch(join, 'screenshots', {'screenshot_urls': screenshot_urls}):
+            yield result
+
+    async def parse_cast_and_crew(self, response):
+        join = response.meta['join']
+
+        try:
+            cast_crew_data = await self.parse_pool.run(extract_cast_and_crew, response)
+        except Exception:
+            for result in self.finish_branch(join, 'cast', record=False):
+                yield result
+            raise
+        for result in self.finish_branch(join, 'cast', {'cast_and_crew': cast_crew_data}):
+            yield result
+
+    async def parse_camelcamelcamel(self, response):
+        
+        join = response.meta['join']
+        price_details = response.meta['price_details']
+
+        try:
+            product_details, table_found = await self.parse_pool.run(extract_camelcamelcamel, response)
+        except Exception:
+            # Carry on with eBay, as when the page couldn't be downloaded
+            for result in self.ebay_or_finish(join, price_details):
+                yield result
+            raise
+        if not table_found:
+            self.logger.warning("Product details table not found")
+
+        for k in ['upc', 'manufacturer', 'isbn', 'ean', 'sku']:
+            if k == 'upc':
+                if k not in product_details: continue
+            price_details[k.lower()] = product_details.get(k, '')
+
+        price_details.update({
+            'amazon_current_price': product_details.get('amazon_current_price', '-'),
+            'amazon_average_price': product_details.get('amazon_average_price', '-'),
+            'third_used_current_price': product_details.get('third_used_current_price', '-'),
+            'third_used_average_price': product_details.get('third_used_average_price', '-'),
+        })
+
+        for result in self.ebay_or_finish(join, price_details):
+            yield result
+
+    def amazon_redirect_request(self, amzn_link, meta, hops=0):
+        # Follow the buy link one hop at a time instead of blocking on
+        # requests.get; the final Amazon page itself is never downloaded.
+        timeout = self.settings.getfloat('AMAZON_REDIRECT_TIMEOUT', 30)
+        meta = {
+            **meta,
+            'join_branch': 'price',
+            'amazon_hops': hops,
+            'dont_redirect': True,
+            'handle_httpstatus_list': AMAZON_REDIRECT_CODES,
+            'download_timeout': min(timeout, meta['join'].remaining()),
+        }
+        # The first hop (blu-ray.com's link/click.php) stays in the blu-ray.com
+        # slot and its throttling; only the off-site hops share the redirect slot
+        if urlparse(amzn_link).hostname != urlparse(self.base_url).hostname:
+            meta['download_slot'] = AMAZON_REDIRECT_SLOT
+        return scrapy.Request(
+            url=amzn_link,
+            callback=self.parse_amazon_redirect,
+            errback=self.amazon_redirect_failed,
+            priority=PRIORITY_ENRICHMENT,
+            meta=meta,
+            dont_filter=True
+        )
+
+    def parse_amazon_redirect(self, response):
+        meta = {k: response.meta[k] for k in ('join', 'price_details', 'amazon_link')}
+
+        try:
+            final_url = response.url
+            if response.status in AMAZON_REDIRECT_CODES:
+                location = response.headers.get('Location', b'').decode('latin-1')
+                if location:
+                    final_url = response.urljoin(location)
+                    hops = response.meta['amazon_hops'] + 1
+                    if not AMAZON_ASIN_RE.search(final_url) and hops < AMAZON_MAX_HOPS:
+                        yield self.amazon_redirect_request(final_url, meta, hops)
+                        return
+
+            amazon_id = amazon_id_from_url(final_url)
+        except Exception:
+            yield from self.ebay_or_finish(meta['join'], meta['price_details'])
+            raise
+        meta['price_details']["amazon_id"] = amazon_id
+        yield self.camelcamelcamel_request(amazon_id, meta)
+
+    def price_meta(self, meta):
+        # camelcamelcamel and eBay go through the PRICE_PROXY (Zyte) when one is set
+        if self.price_proxy:
+            meta['proxy'] = self.price_proxy
+        return meta
+
+    def camelcamelcamel_request(self, amazon_id, meta):
+        return scrapy.Request(
+            url=f'{self.camelcamelcamel_url}/product/{amazon_id}',
+            callback=self.parse_camelcamelcamel,
+            errback=self.amazon_redirect_failed,
+            priority=PRIORITY_ENRICHMENT,
+            meta=self.price_meta({
+                **meta,
+                'join_branch': 'price',
+                'download_timeout': meta['join'].remaining(),
+                # 'browserHtml': True 
+            }),
+            dont_filter=True
+        )
+
+    def amazon_redirect_failed(self, failure):
+        # Amazon or camelcamelcamel failed: the UPC from the detail page can
+        # still get us an eBay EPID.
+        request = failure.request
+        self.logger.warning(f"Price lookup failed for {request.url}: {failure.value!r}")
+        yield from self.ebay_or_finish(request.meta['join'], request.meta['price_details'])
+
+    def ebay_or_finish(self, join, price_details):
+        if join.timed_out:
+            return
+        upc = price_details.get('upc') or join.movie_details.get('upc', None)
+        if not upc:
+            yield from self.finish_branch(join, 'price', price_details)
+            return
+
+        # Searched earlier (this run or a previous one): match this title against those listings
+        results = self.catalog.cached_ebay_results(upc, self.epid_ttl, self.epid_miss_ttl)
+        if results is not None:
+            self.crawler.stats.inc_value('ebay/epid_cache_hits')
+            self.match_epid(join, price_details, results)
+            yield from self.finish_branch(join, 'price', price_details)
+            return
+
+        # Editions and country variants share UPCs: one search per UPC at a time
+        if not self.ebay_lookups.join(upc, (join, price_details)):
+            self.crawler.stats.inc_value('ebay/coalesced')
+            return
+        yield scrapy.Request(
+            url=f'{self.ebay_url}/sch/i.html?_nkw={upc}',
+            callback=self.parse_epid_results,
+            errback=self.ebay_failed,
+            priority=PRIORITY_ENRICHMENT,
+            meta=self.price_meta({
+                'upc': upc,
+                'max_results': 4,
+                'download_timeout': join.remaining(),
+            }),
+            dont_filter=True
+        )
+
+    def parse_epid_results(self, response):
+        upc = response.meta["upc"]
+        max_results = response.meta.get("max_results", 10)
+
+        waiters = self.ebay_lookups.release(upc)
+        try:
+            # Listings that link to a catalog product
+            results = []
+            for item in response.css("ul.srp-results > li.s-item")[:max_results]:
+                product_url = item.css("a.s-item__link::attr(href)").get()
+                if not product_url:
+                    continue
+                epid = parse_qs(urlparse(product_url).query).get("epid", [None])[0]
+                if epid:
+                    results.append((item.css('.s-item__title > span::text').get(), epid))
+        except Exception:
+            for join, price_details in waiters:
+                yield from self.finish_branch(join, 'price', price_details, record=False)
+            raise
+
+        # Every movie waiting on this UPC picks its own best match from the one page
+        self.catalog.set_ebay_results(upc, results)
+        for join, price_details in waiters:
+            self.match_epid(join, price_details, results)
+            yield from self.finish_branch(join, 'price', price_details)
+
+    def match_epid(self, join, price_details, results):
+        best = TitleMatcher(join.movie_details.get('title', '')).best([title for title, epid in results])
+        if best is not None:
+            price_details["epid"] = results[best][1]
+
+    def ebay_failed(self, failure):
+        request = failure.request
+        self.logger.warning(f"eBay lookup failed for {request.url}: {failure.value!r}")
+        # Not checkpointed or cached: a resumed run tries again
+        for join, price_details in self.ebay_lookups.release(request.meta['upc']):
+            yield from self.finish_branch(join, 'price', price_details, record=False)
@@ -0,0 +1,52 @@
+from blu_ray_scraper.enrichment import MovieJoin
+from blu_ray_scraper.spiders.bluray_catalog import BluRayCatalogSpider
+
+
+class PriceRefreshSpider(BluRayCatalogSpider):
+    """
+    Refreshes only the prices of titles already in the catalog.
+
+        scrapy crawl price_refresh
+
+    Reads the stored ASIN (amazon_id) and UPC of every record and re-runs
+    just the camelcamelcamel and eBay hops; blu-ray.com itself is never
+    fetched, so the new_price / used_price from the detail page are left
+    as they are. PriceRefreshPipeline updates the records in place and
+    PriceHistoryPipeline appends every result to the price history.
+    """
+    name = "price_refresh"
+
+    custom_settings = {
+        **BluRayCatalogSpider.custom_settings,
+        'ITEM_PIPELINES': {
+            'blu_ray_scraper.pipelines.PriceRefreshPipeline': 300,
+            'blu_ray_scraper.pipelines.PriceHistoryPipeline': 305,
+        },
+        # Nothing but price lookups in flight, so let them run wide
+        'ADAPTIVE_DOMAINS': {
+            "camelcamelcamel.com": {"concurrency": 16, "delay": 0, "max_concurrency": 32},
+            "www.ebay.com": {"concurrency": 16, "delay": 0, "max_concurrency": 32},
+        },
+    }
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('country', 'us')
+        super().__init__(*args, **kwargs)
+
+    def start_requests(self):
+        timeout = self.settings.getfloat('ENRICHMENT_TIMEOUT', 180)
+        for key, record in self.catalog.records():
+            amazon_id = record.get('amazon_id')
+            upc = record.get('upc')
+            if not amazon_id and not upc:
+                continue
+
+            movie = {'blu_ray_url': record['blu_ray_url'], 'title': record.get('title', ''), 'upc': upc}
+            join = MovieJoin(movie, ['price'], timeout=timeout)
+            join.start(self.join_expired)
+            self.movies_in_flight += 1
+            if amazon_id:
+                meta = {'join': join, 'price_details': {'amazon_id': amazon_id}, 'amazon_link': None}
+                yield self.camelcamelcamel_request(amazon_id, meta)
+            else:
+                yield from self.ebay_or_finish(join, {})
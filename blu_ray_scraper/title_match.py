@@ -0,0 +1,127 @@
+"""
+Title matching for the eBay EPID lookup.
+
+A TitleMatcher is built once per movie: the title is normalised (accents
+folded, apostrophes dropped, lower case) and split into a frozenset of
+weighted tokens. Format and packaging words ("Blu-ray", "4K", "DVD",
+"Steelbook", ...) weigh nothing and articles little, so "Heat (4K Ultra
+HD + Blu-ray)" still matches "Heat". Words that are also common in
+titles ("New", "Digital", "Edition", ...) only weigh nothing inside a
+packaging phrase: "(Blu-ray + Digital)" or "Limited Edition", not "The
+New World". score() is the weighted share of the title's tokens that a
+candidate contains, 0-100.
+"""
+import re
+import unicodedata
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+BRACKETS_RE = re.compile(r'[(\[][^)\]]*[)\]]')
+APOSTROPHES = str.maketrans('', '', "'’")
+
+# Listing noise: formats, editions and packaging
+NOISE_TOKENS = (
+    'blu', 'ray', 'bluray', '4k', 'uhd', 'ultra', 'dvd', '3d', 'copy', 'code',
+    'disc', 'discs', 'steelbook', 'widescreen', 'sealed',
+)
+# Noise only inside a packaging phrase: "Blu-ray + Digital", "Limited Edition",
+# "Region Free", "Brand New", but not "The New World"
+PACKAGING_TOKENS = ('new', 'hd', 'digital', 'edition', 'region')
+PACKAGING_QUALIFIERS = (
+    'limited', 'special', 'collectors', 'anniversary', 'deluxe', 'ultimate', 'extended',
+    'brand', 'free',
+)
+STOP_TOKENS = ('the', 'a', 'an', 'and', 'of')
+
+DEFAULT_WEIGHTS = {
+    **{token: 0.0 for token in NOISE_TOKENS},
+    **{token: 0.25 for token in STOP_TOKENS},
+}
+
+
+def words(text):
+    text = text or ''
+    if not text.isascii():
+        # Fold accents: "Amélie" -> "amelie"
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return TOKEN_RE.findall(text.lower().translate(APOSTROPHES))
+
+
+def tokenize(text):
+    return frozenset(words(text))
+
+
+def packaging_words(text, weights):
+    """
+    Words of `text` that only ever appear in a packaging phrase: a
+    PACKAGING_TOKEN in brackets or next to a noise word, a qualifier or
+    another packaging word, the qualifiers next to one ("Limited Edition")
+    and region codes ("Region B").
+    """
+    packaging, plain = set(), set()
+    text = text or ''
+    segments = [(group, True) for group in BRACKETS_RE.findall(text)]
+    segments += [(segment, False) for segment in BRACKETS_RE.split(text)]
+    for segment, bracketed in segments:
+        segment = words(segment)
+        noise = [weights.get(word) == 0 for word in segment]
+        in_phrase = [is_noise or (bracketed and word in PACKAGING_TOKENS) for word, is_noise in zip(segment, noise)]
+        # Spread along chains such as "4k ultra hd digital"
+        changed = True
+        while changed:
+            changed = False
+            for i, word in enumerate(segment):
+                if in_phrase[i]:
+                    continue
+                neighbours = [j for j in (i - 1, i + 1) if 0 <= j < len(segment)]
+                if word in PACKAGING_TOKENS:
+                    found = any(in_phrase[j] or segment[j] in PACKAGING_QUALIFIERS for j in neighbours)
+                elif word in PACKAGING_QUALIFIERS:
+                    found = any(in_phrase[j] for j in neighbours)
+                else:
+                    found = i > 0 and segment[i - 1] == 'region' and (len(word) == 1 or word.isdigit())
+                    if found:
+                        in_phrase[i - 1] = True
+                if found:
+                    in_phrase[i] = changed = True
+        for word, is_noise, found in zip(segment, noise, in_phrase):
+            if not is_noise:
+                (packaging if found else plain).add(word)
+    return packaging - plain
+
+
+class TitleMatcher:
+
+    def __init__(self, title, weights=None, threshold=80):
+        if weights is None:
+            weights = DEFAULT_WEIGHTS
+        self.threshold = threshold
+        self.tokens = tokenize(title)
+        self.token_weights = {token: weights.get(token, 1.0) for token in self.tokens}
+        for token in packaging_words(title, weights):
+            self.token_weights[token] = 0.0
+        self.total = sum(self.token_weights.values())
+        if not self.total:
+            # A title made of noise words only ("Ultra", "3D"): count them all
+            self.token_weights = dict.fromkeys(self.tokens, 1.0)
+            self.total = len(self.tokens)
+
+    def score(self, candidate):
+        if not self.total:
+            return 0
+        token_weights = self.token_weights
+        return sum(token_weights[token] for token in self.tokens.intersection(words(candidate))) / self.total * 100
+
+    def scores(self, candidates):
+        """Score of every candidate title (None scores 0), in order."""
+        return [self.score(candidate) if candidate else 0 for candidate in candidates]
+
+    def best(self, candidates):
+        """Index of the best scoring candidate at or above the threshold (ties go to the first), or None."""
+        best, best_score = None, self.threshold
+        for i, score in enumerate(self.scores(candidates)):
+            if score >= best_score and (best is None or score > best_score):
+                best, best_score = i, score
+        return best
+
+    def matches(self, candidate):
+        return self.score(candidate) >= self.threshold
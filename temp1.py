@@ -1,14 +1,19 @@
-import json
+import os
+from blu_ray_scraper.item_store import JsonlItemStore, iter_items
 
-master_data = []
+# Rebuilt from scratch each run, like the old json.dump
+if os.path.exists('data/DVD-us.jsonl'):
+    os.remove('data/DVD-us.jsonl')
+
+master_data = JsonlItemStore('data/DVD-us.jsonl')
 for year in range(1996, 2025):
     print(year)
-    try:
-        with open(f'data/DVD-{year}.json', 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            master_data.extend(data)
-    except FileNotFoundError:
+    for path in (f'data/DVD-{year}.jsonl', f'data/DVD-{year}.json'):
+        if os.path.exists(path):
+            for item in iter_items(path):
+                master_data.append(item)
+            break
+    else:
         print(f"File for year {year} not found. Skipping.")
 
-with open('data/DVD-us.json', 'w', encoding='utf-8') as outfile:
-    json.dump(master_data, outfile, indent=4)
\ No newline at end of file
+master_data.close()